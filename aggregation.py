@@ -0,0 +1,215 @@
+"""Parallell aggregering av skadeanmälningar över flera processer
+
+claims-tabellen och arkivfilerna (se archive.py) delas upp i intervall av
+claim_id. Varje intervall läses av en egen process med en skrivskyddad
+anslutning och ger delaggregat (antal, summa, kvadratsumma, min, max och en
+kvantilskiss) per fordonsklass och period. Delaggregaten slås sedan ihop i
+huvudprocessen, så arbetet skalar med antalet kärnor.
+"""
+import math
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from claim_statistics import ClaimStatistics
+
+EPOCH = date(1970, 1, 1)
+
+# Period -> funktion från dagnummer till periodens namn
+PERIODS = {
+    "month": lambda day: (EPOCH + timedelta(days=day)).strftime("%Y-%m"),
+    "year": lambda day: str((EPOCH + timedelta(days=day)).year),
+    None: lambda day: None,
+}
+
+
+class QuantileSketch:
+    """Kvantilskiss med relativ noggrannhet (samma idé som DDSketch)
+
+    Värdena räknas i logaritmiska hinkar, så att varje skattad kvantil
+    ligger inom relative_accuracy från ett verkligt värde. Två skisser med
+    samma noggrannhet slås ihop genom att hinkarna adderas.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        # Värden <= 0 har ingen logaritm och räknas för sig
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Skisserna måste ha samma noggrannhet")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        """Skattat värde för kvantilen q (0-1), None för en tom skiss"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Hinkens mittpunkt har högst relative_accuracy relativt fel
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+def _aggregate_range(db_name, first_id, last_id, period, relative_accuracy, archive_run=None):
+    """Delaggregat för claim_id i [first_id, last_id]; körs i en arbetsprocess
+
+    För en arkivfil är archive_run den senaste avslutade arkiveringen.
+    """
+    conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+    try:
+        sql = """
+        SELECT day, vehicle_class_id, amount_ore FROM claims
+        WHERE claim_id BETWEEN ? AND ?
+        """
+        params = [first_id, last_id]
+        if archive_run is not None:
+            sql += " AND archive_run <= ?"
+            params.append(archive_run)
+        rows = conn.execute(sql, params)
+
+        to_period = PERIODS[period]
+        periods = {}
+        groups = {}
+        for day, class_id, amount_ore in rows:
+            name = periods.get(day)
+            if name is None:
+                name = periods[day] = to_period(day)
+            amount = amount_ore / 100
+            group = groups.get((class_id, name))
+            if group is None:
+                group = groups[(class_id, name)] = [0, 0.0, 0.0, amount, amount,
+                                                    QuantileSketch(relative_accuracy)]
+            group[0] += 1
+            group[1] += amount
+            group[2] += amount * amount
+            if amount < group[3]:
+                group[3] = amount
+            if amount > group[4]:
+                group[4] = amount
+            group[5].add(amount)
+        return groups
+    finally:
+        conn.close()
+
+
+def _merge_groups(target, partial):
+    for key, group in partial.items():
+        existing = target.get(key)
+        if existing is None:
+            target[key] = group
+            continue
+        existing[0] += group[0]
+        existing[1] += group[1]
+        existing[2] += group[2]
+        existing[3] = min(existing[3], group[3])
+        existing[4] = max(existing[4], group[4])
+        existing[5].merge(group[5])
+
+
+class ParallelAggregator:
+    """Skadefrekvens och skadebelopp per fordonsklass och period, beräknat parallellt"""
+
+    def __init__(self, db_name, processes=None, partitions_per_process=4,
+                 relative_accuracy=0.01):
+        self.db_name = os.path.abspath(db_name)
+        self.processes = processes or os.cpu_count() or 1
+        self.partitions_per_process = partitions_per_process
+        self.relative_accuracy = relative_accuracy
+
+    def partitions(self):
+        """Delar upp claim_id-intervallen i databasen och arkivfilerna i lika breda delar
+
+        Returnerar (fil, första id, sista id, archive_run) per del.
+        """
+        conn = sqlite3.connect(f"file:{self.db_name}?mode=ro", uri=True)
+        try:
+            files = [(self.db_name, None)]
+            files.extend(conn.execute("SELECT path, run FROM claim_archives"))
+        finally:
+            conn.close()
+
+        ranges = []
+        for path, run in files:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                first_id, last_id = conn.execute(
+                    "SELECT min(claim_id), max(claim_id) FROM claims").fetchone()
+            finally:
+                conn.close()
+            if first_id is not None:
+                ranges.append((path, first_id, last_id, run))
+        if not ranges:
+            return []
+
+        count = self.processes * self.partitions_per_process
+        total = sum(last_id - first_id + 1 for _, first_id, last_id, _ in ranges)
+        width = max(math.ceil(total / count), 1)
+        return [(path, start, min(start + width - 1, last_id), run)
+                for path, first_id, last_id, run in ranges
+                for start in range(first_id, last_id + 1, width)]
+
+    def aggregate(self, period="month", quantiles=(0.5, 0.9, 0.99)):
+        """Statistik per fordonsklass och period ("month", "year" eller None)
+
+        Varje rad har samma mått som ClaimStatistics (count är skadefrekvensen,
+        mean den genomsnittliga skadekostnaden) plus skattade kvantiler av
+        beloppet som p50, p90, p99 osv.
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Okänd period: {period}")
+
+        tasks = [(path, first_id, last_id, period, self.relative_accuracy, run)
+                 for path, first_id, last_id, run in self.partitions()]
+        groups = {}
+        if self.processes == 1:
+            for task in tasks:
+                _merge_groups(groups, _aggregate_range(*task))
+        else:
+            with ProcessPoolExecutor(self.processes) as executor:
+                futures = [executor.submit(_aggregate_range, *task) for task in tasks]
+                for future in futures:
+                    _merge_groups(groups, future.result())
+
+        conn = sqlite3.connect(f"file:{self.db_name}?mode=ro", uri=True)
+        try:
+            class_names = dict(conn.execute("SELECT vehicle_class_id, name FROM vehicle_classes"))
+        finally:
+            conn.close()
+
+        statistics = []
+        for (class_id, period_name), group in groups.items():
+            keys = {"vehicle_class": class_names[class_id]}
+            if period is not None:
+                keys["period"] = period_name
+            row = ClaimStatistics.summarize(group[:5], **keys)
+            for q in quantiles:
+                estimate = group[5].quantile(q)
+                # Min och max är exakta, skattningen hålls inom dem
+                row[f"p{q * 100:g}"] = min(max(estimate, group[3]), group[4])
+            statistics.append(row)
+
+        statistics.sort(key=lambda row: (row["vehicle_class"], row.get("period", "")))
+        return statistics
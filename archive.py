@@ -0,0 +1,168 @@
+"""Arkivering av gamla skadeanmälningar till en SQLite-fil per år
+
+Anmälningar äldre än en brytpunkt flyttas från claims till arkivfiler som
+DatabaseManager kopplar in med ATTACH när en fråga berör deras år. Arkivfilerna
+har samma kolumner som claims plus archive_run, egna index och ett eget
+sökindex, och förtecknas i claim_archives i huvuddatabasen. Dubblettnycklarna
+för arkiverade anmälningar ligger kvar i huvuddatabasen, i claim_archive_keys.
+
+En arkivering sker i två steg per år: raderna kopieras först till arkivfilen
+och tas sedan bort ur claims samtidigt som claim_archives.run räknas upp.
+Läsningar räknar bara arkivrader med archive_run <= run, så en anmälan syns
+aldrig två gånger, och rester från en avbruten kopiering städas bort nästa gång.
+"""
+import os
+import secrets
+from datetime import date
+
+import migrations
+from dedup import content_hash
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def archive_schema(year):
+    """Namnet som arkivfilen för year kopplas in under"""
+    return f"archive_{int(year)}"
+
+
+def year_days(year):
+    """Första och sista dagen (dagar sedan 1970-01-01) för year"""
+    return (date(year, 1, 1).toordinal() - EPOCH_ORDINAL,
+            date(year, 12, 31).toordinal() - EPOCH_ORDINAL)
+
+
+def day_to_year(day):
+    return date.fromordinal(day + EPOCH_ORDINAL).year
+
+
+def new_archive_path(db_manager, year):
+    """Ett nytt, unikt filnamn, så att en borttagen fil aldrig förväxlas med en ny"""
+    stem = os.path.splitext(os.path.basename(db_manager.db_name))[0]
+    return os.path.join(db_manager.archive_dir,
+                        f"{stem}-archive-{year}-{secrets.token_hex(4)}.db")
+
+
+def create_archive_tables(conn, schema):
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {schema}.claims (
+        claim_id INTEGER PRIMARY KEY,
+        day INTEGER NOT NULL,
+        vehicle_class_id INTEGER NOT NULL,
+        amount_ore INTEGER NOT NULL,
+        description TEXT,
+        archive_run INTEGER NOT NULL
+    )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_claims_day ON claims (day)")
+    conn.execute(f"""
+    CREATE INDEX IF NOT EXISTS {schema}.idx_claims_class_day
+    ON claims (vehicle_class_id, day)
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_claims_run ON claims (archive_run)")
+    conn.execute(f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.claims_fts USING fts5(
+        description, content='claims', content_rowid='claim_id', prefix='2 3'
+    )
+    """)
+
+
+def archive_claims(db_manager, before_day):
+    """Flyttar anmälningar med dag < before_day till arkivfilerna, returnerar antalet"""
+    conn = db_manager.get_connection()
+    first_day = conn.execute("SELECT min(day) FROM claims").fetchone()[0]
+    if first_day is None or first_day >= before_day:
+        return 0
+
+    archives = {year: (path, run)
+                for year, path, run in conn.execute("SELECT year, path, run FROM claim_archives")}
+    run = max((run for _, run in archives.values()), default=0) + 1
+
+    moved = 0
+    for year in range(day_to_year(first_day), day_to_year(before_day - 1) + 1):
+        low = year_days(year)[0]
+        high = min(year_days(year)[1], before_day - 1)
+        has_rows = conn.execute("""
+        SELECT EXISTS (SELECT 1 FROM claims WHERE day BETWEEN ? AND ?)
+        """, (low, high)).fetchone()[0]
+        if not has_rows:
+            continue
+        path, committed = archives.get(year) or (new_archive_path(db_manager, year), 0)
+        moved += _archive_year(db_manager, year, path, committed, run, low, high)
+    return moved
+
+
+def _archive_year(db_manager, year, path, committed, run, low, high):
+    schema = archive_schema(year)
+    conn = db_manager.get_connection()
+    # ATTACH och PRAGMA går inte att köra inne i en transaktion
+    db_manager._attach_archives(conn, [(schema, path)])
+    conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+    # Kopian måste ligga på disk innan raderna tas bort ur claims
+    conn.execute(f"PRAGMA {schema}.synchronous=FULL")
+
+    with db_manager.transaction() as conn:
+        create_archive_tables(conn, schema)
+        # Rester från en avbruten arkivering
+        conn.execute(f"""
+        INSERT INTO {schema}.claims_fts (claims_fts, rowid, description)
+        SELECT 'delete', claim_id, description FROM {schema}.claims WHERE archive_run > ?
+        """, (committed,))
+        conn.execute(f"DELETE FROM {schema}.claims WHERE archive_run > ?", (committed,))
+
+        conn.execute(f"""
+        INSERT INTO {schema}.claims
+            (claim_id, day, vehicle_class_id, amount_ore, description, archive_run)
+        SELECT claim_id, day, vehicle_class_id, amount_ore, description, ?
+        FROM main.claims WHERE day BETWEEN ? AND ?
+        """, (run, low, high))
+        conn.execute(f"""
+        INSERT INTO {schema}.claims_fts (rowid, description)
+        SELECT claim_id, description FROM {schema}.claims WHERE archive_run = ?
+        """, (run,))
+
+    # Bara de rader som faktiskt kopierades tas bort; anmälningar som lagts
+    # till under tiden stannar i claims
+    copied = f"SELECT claim_id FROM {schema}.claims WHERE archive_run = ?"
+    with db_manager.transaction() as conn:
+        # Dubblettkontrollen slår upp arkiverade anmälningar i claim_archive_keys;
+        # rader från före dubblettkontrollen får sitt hashvärde här
+        conn.execute(f"""
+        INSERT INTO claim_archive_keys (claim_id, content_hash, idempotency_key)
+        SELECT claim_id, content_hash, idempotency_key FROM main.claims
+        WHERE claim_id IN ({copied})
+        """, (run,))
+        unhashed = conn.execute(f"""
+        SELECT claim_id, day, vehicle_class_id, amount_ore, description FROM main.claims
+        WHERE claim_id IN ({copied}) AND content_hash IS NULL AND idempotency_key IS NULL
+        """, (run,)).fetchall()
+        conn.executemany("UPDATE claim_archive_keys SET content_hash = ? WHERE claim_id = ?",
+                         [(content_hash(*row[1:]), row[0]) for row in unhashed])
+
+        # Sökindexet uppdateras med en sats istället för via triggern rad för rad
+        conn.execute("INSERT INTO claims_fts_paused DEFAULT VALUES")
+        conn.execute(f"""
+        INSERT INTO claims_fts (claims_fts, rowid, description)
+        SELECT 'delete', claim_id, description FROM main.claims WHERE claim_id IN ({copied})
+        """, (run,))
+        # Arkiverade claim_id får aldrig delas ut igen, inte heller det högsta
+        migrations.record_last_claim_id(conn)
+        cursor = conn.execute(f"DELETE FROM main.claims WHERE claim_id IN ({copied})", (run,))
+        conn.execute("DELETE FROM claims_fts_paused")
+        conn.execute("INSERT OR REPLACE INTO claim_archives (year, path, run) VALUES (?, ?, ?)",
+                     (year, path, run))
+    return cursor.rowcount
+
+
+def remove_archive_files(paths):
+    """Tar bort arkivfilerna med WAL-filer
+
+    En fil som fortfarande är öppen i en annan tråd går inte att ta bort på
+    Windows; den ligger då kvar men används aldrig igen.
+    """
+    for path in paths:
+        for name in (path, path + "-wal", path + "-shm"):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
@@ -0,0 +1 @@
+"""Prestandamätningar för databaslagret och valideringen"""
@@ -0,0 +1,41 @@
+"""Mäter hur ParallelAggregator skalar med antalet processer
+
+Körs från projektroten:  python -m benchmarks.bench_aggregation --rows 10000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from aggregation import ParallelAggregator
+from database import DatabaseManager
+from benchmarks.generator import generate_claims
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--period", default="month", choices=["month", "year", "none"])
+    args = parser.parse_args()
+    period = None if args.period == "none" else args.period
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "aggregation.db")
+        db = DatabaseManager(path)
+        db.add_claims_bulk(generate_claims(args.rows))
+        db.close()
+
+        baseline = None
+        processes = 1
+        while processes <= args.max_processes:
+            start = time.perf_counter()
+            ParallelAggregator(path, processes).aggregate(period)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{processes:>3} processer {elapsed:8.2f} s  {baseline / elapsed:5.2f}x")
+            processes *= 2
+
+
+if __name__ == "__main__":
+    main()
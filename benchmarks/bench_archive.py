@@ -0,0 +1,89 @@
+"""Jämför läsningar och rensning med och utan arkivering av gamla anmälningar
+
+Samma data läses från en databas där allt ligger i claims och från en där
+anmälningar före --cutoff har flyttats till arkivfiler per år. Rensningen
+jämförs med den tidigare varianten, DELETE rad för rad.
+Körs från projektroten:  python -m benchmarks.bench_archive --rows 1000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from claim_statistics import ClaimStatistics
+from database import DatabaseManager
+from benchmarks.generator import generate_claims
+
+
+def timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def read_timings(db, repeat):
+    def pages():
+        page = db.get_claims_page(200)
+        for _ in range(20):
+            page = db.get_claims_page(200, after=(page[-1][1], page[-1][0]))
+
+    return {
+        "första sidan": timed(lambda: db.get_claims_page(200), repeat),
+        "20 sidor framåt": timed(pages, repeat),
+        "senaste kvartalet": timed(lambda: db.query_claims(
+            date_from="2024-10-01", date_to="2024-12-31"), repeat),
+        "ett arkiverat år": timed(lambda: db.query_claims(
+            vehicle_class="Truck", date_from="2016-01-01", date_to="2016-12-31"), repeat),
+        "sökning": timed(lambda: db.search_claims("älg", limit=100), repeat),
+    }
+
+
+def delete_rows(db):
+    """Den tidigare clear_database: DELETE rad för rad"""
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO claims_fts_paused DEFAULT VALUES")
+        conn.execute("DELETE FROM claims")
+        conn.execute("INSERT INTO claims_fts (claims_fts) VALUES ('delete-all')")
+        conn.execute("DELETE FROM claims_fts_paused")
+        ClaimStatistics.clear(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cutoff", default="2024-01-01")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "flat.db")
+        db = DatabaseManager(path)
+        db.add_claims_bulk(generate_claims(args.rows))
+        db.close()
+        for name in ("archived.db", "delete.db"):
+            shutil.copy(path, os.path.join(tmp, name))
+
+        flat = DatabaseManager(path, query_cache_entries=0)
+        archived = DatabaseManager(os.path.join(tmp, "archived.db"), query_cache_entries=0)
+        start = time.perf_counter()
+        moved = archived.archive_claims(args.cutoff)
+        print(f"{moved} anmälningar före {args.cutoff} arkiverade "
+              f"på {time.perf_counter() - start:.2f} s")
+
+        before, after = read_timings(flat, args.repeat), read_timings(archived, args.repeat)
+        print(f"{'':<20} {'utan arkiv':>12} {'med arkiv':>12}")
+        for name in before:
+            print(f"{name:<20} {before[name] * 1000:9.2f} ms {after[name] * 1000:9.2f} ms  "
+                  f"{before[name] / after[name]:6.2f}x")
+
+        deleting = DatabaseManager(os.path.join(tmp, "delete.db"))
+        print(f"{'rensning, DELETE':<20} {timed(lambda: delete_rows(deleting)):9.2f} s")
+        print(f"{'clear_database':<20} {timed(archived.clear_database):9.2f} s")
+        for db in (flat, archived, deleting):
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
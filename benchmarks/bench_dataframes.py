@@ -0,0 +1,56 @@
+"""Jämför get_all_claims + DataFrame med den strömmade DataFrame-exporten
+
+Mäter tid och högsta minnesanvändning (tracemalloc, i en separat körning) för båda vägarna.
+Kräver pandas, och pyarrow för Parquet-delen.
+Körs från projektroten:  python -m benchmarks.bench_dataframes --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from database import DatabaseManager
+from export import export_parquet
+from benchmarks.generator import generate_claims
+
+
+def measure(label, func):
+    # Tiden mäts utan tracemalloc, som annars gör varje allokering dyrare
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<45} {elapsed:8.2f} s  topp {peak / 2**20:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "frames.db"))
+        db.add_claims_bulk(generate_claims(args.rows))
+
+        columns = ["claim_id", "date", "vehicle_class", "claim_amount", "description"]
+        measure("get_all_claims -> DataFrame (tupler)",
+                lambda: pd.DataFrame(db.get_all_claims(), columns=columns))
+        measure("to_dataframe (typade omgångar)",
+                lambda: db.to_dataframe(args.chunksize))
+        measure("iter_dataframes (endast en omgång i minnet)",
+                lambda: sum(len(frame) for frame in db.iter_dataframes(args.chunksize)))
+        measure("export_parquet",
+                lambda: export_parquet(db, os.path.join(tmp, "claims.parquet"), args.chunksize))
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Mäter tid och minnestopp för rapportexporten (CSV, CSV+gzip och Excel)
+
+Varje export körs i en egen process, vars högsta RSS jämförs med ett fast
+tak; exporten ska inte växa med tabellen. Kräver openpyxl för Excel-delen.
+Körs från projektroten:  python -m benchmarks.bench_export --rows 5000000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from database import DatabaseManager
+from export import export_csv, export_xlsx
+from benchmarks.generator import generate_claims
+
+EXPORTS = {
+    "csv": ("claims.csv", lambda db, path, chunksize: export_csv(db, path, chunksize)),
+    "csv.gz": ("claims.csv.gz",
+               lambda db, path, chunksize: export_csv(db, path, chunksize, "gzip")),
+    "xlsx": ("claims.xlsx", lambda db, path, chunksize: export_xlsx(db, path, chunksize)),
+}
+
+
+def peak_rss_mib():
+    # ru_maxrss är i KiB på Linux men i byte på macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def run_export(name, db_path, out_path, chunksize, results):
+    db = DatabaseManager(db_path, query_cache_entries=0)
+    before = peak_rss_mib()
+    start = time.perf_counter()
+    rows = EXPORTS[name][1](db, out_path, chunksize)
+    elapsed = time.perf_counter() - start
+    db.close()
+    results.put((rows, elapsed, before, peak_rss_mib()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--formats", default="csv,csv.gz,xlsx")
+    parser.add_argument("--max-memory-mb", type=float, default=256,
+                        help="högsta tillåtna RSS för en exportprocess")
+    args = parser.parse_args()
+
+    formats = args.formats.split(",")
+    unknown = set(formats) - set(EXPORTS)
+    if unknown:
+        parser.error(f"okända format: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "export.db")
+        db = DatabaseManager(db_path)
+        db.add_claims_bulk(generate_claims(args.rows))
+        db.close()
+
+        over = []
+        for name in formats:
+            out_path = os.path.join(tmp, EXPORTS[name][0])
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=run_export, args=(name, db_path, out_path, args.chunksize, results))
+            process.start()
+            rows, elapsed, before, peak = results.get()
+            process.join()
+
+            size = os.path.getsize(out_path) / 2**20
+            print(f"{name:<7} {rows:>10} rader {elapsed:8.2f} s ({rows / elapsed:>9,.0f} rader/s)"
+                  f"  fil {size:8.1f} MiB  RSS före {before:6.1f} MiB  topp {peak:6.1f} MiB")
+            if peak > args.max_memory_mb:
+                over.append(name)
+
+    if over:
+        raise SystemExit(f"över minnestaket {args.max_memory_mb} MiB: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Jämför insättningar per sekund före och efter den långlivade anslutningen
+
+Körs från projektroten:  python -m benchmarks.bench_inserts --rows 2000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from database import DatabaseManager
+
+
+def legacy_add_claim(db_name, date, vehicle_class, claim_amount, description=""):
+    """Det gamla sättet: ny anslutning och commit för varje anmälan"""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute("""
+    INSERT INTO claims (date, vehicle_class, claim_amount, description)
+    VALUES (?, ?, ?, ?)
+    """, (date, vehicle_class, claim_amount, description))
+    conn.commit()
+    claim_id = cursor.lastrowid
+    conn.close()
+    return claim_id
+
+
+def run_legacy(db_name, rows):
+    # Den ursprungliga tabellen i standardläge (rollback journal, synchronous=FULL)
+    conn = sqlite3.connect(db_name)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS claims (
+        claim_id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        vehicle_class TEXT NOT NULL,
+        claim_amount REAL NOT NULL,
+        description TEXT
+    )
+    """)
+    conn.commit()
+    conn.close()
+
+    start = time.perf_counter()
+    for i in range(rows):
+        legacy_add_claim(db_name, "2024-01-01", "Car", 100.0 + i, "bench")
+    return time.perf_counter() - start
+
+
+def run_pooled(db_name, rows, synchronous):
+    db = DatabaseManager(db_name, synchronous=synchronous)
+    start = time.perf_counter()
+    for i in range(rows):
+        db.add_claim("2024-01-01", "Car", 100.0 + i, "bench")
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [("före (ny anslutning per anrop)",
+                    run_legacy(os.path.join(tmp, "legacy.db"), args.rows))]
+        for synchronous in ("FULL", "NORMAL", "OFF"):
+            elapsed = run_pooled(os.path.join(tmp, f"pooled_{synchronous}.db"),
+                                 args.rows, synchronous)
+            results.append((f"efter (WAL, synchronous={synchronous})", elapsed))
+
+    for label, elapsed in results:
+        print(f"{label:<40} {args.rows / elapsed:>12,.0f} insättningar/s")
+
+
+if __name__ == "__main__":
+    main()
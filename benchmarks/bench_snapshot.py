@@ -0,0 +1,73 @@
+"""Jämför statistik per fordonsklass ur radlagret med den kolumnorienterade ögonblicksbilden
+
+Kräver numpy.
+Körs från projektroten:  python -m benchmarks.bench_snapshot --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from claim_statistics import ClaimStatistics
+from database import DatabaseManager
+from snapshot import ClaimSnapshot
+from benchmarks.generator import generate_claims
+
+GROUP_BY_SQL = """
+SELECT v.name, COUNT(*), SUM(c.amount_ore) / 100.0,
+       SUM(CAST(c.amount_ore AS REAL) * c.amount_ore) / 10000.0,
+       MIN(c.amount_ore) / 100.0, MAX(c.amount_ore) / 100.0
+FROM claims AS c JOIN vehicle_classes AS v ON v.vehicle_class_id = c.vehicle_class_id
+GROUP BY v.name
+"""
+
+
+def measure(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<45} {elapsed:10.4f} s")
+    return result
+
+
+def python_aggregate(rows):
+    groups = {}
+    for _, _, vehicle_class, amount, _ in rows:
+        group = groups.setdefault(vehicle_class, [0, 0.0, 0.0, amount, amount])
+        group[0] += 1
+        group[1] += amount
+        group[2] += amount * amount
+        group[3] = min(group[3], amount)
+        group[4] = max(group[4], amount)
+    return [ClaimStatistics.summarize(groups[name], vehicle_class=name) for name in sorted(groups)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--append", type=int, default=10_000,
+                        help="rader som läggs till innan den inkrementella uppdateringen")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "snapshot.db"))
+        db.add_claims_bulk(generate_claims(args.rows))
+        path = os.path.join(tmp, "snapshot")
+
+        measure("get_all_claims + Python per klass", lambda: python_aggregate(db.get_all_claims()))
+        measure("SQL GROUP BY över radlagret",
+                lambda: db.get_connection().execute(GROUP_BY_SQL).fetchall())
+        snapshot = measure("ClaimSnapshot.update (hela tabellen)",
+                           lambda: ClaimSnapshot.update(db, path))
+        measure("snapshot.class_statistics", snapshot.class_statistics, repeat=10)
+        measure("snapshot.monthly_statistics", snapshot.monthly_statistics, repeat=10)
+
+        db.add_claims_bulk(generate_claims(args.append, seed=7))
+        measure(f"ClaimSnapshot.update (+{args.append} rader)",
+                lambda: ClaimSnapshot.update(db, path))
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Jämför radvis validering med batchvalideringen och kontrollerar att de ger samma svar
+
+Körs från projektroten:  python -m benchmarks.bench_validation --rows 1000000
+"""
+import argparse
+import math
+import time
+
+from validators import ClaimValidator, ERROR_MESSAGES, np
+from benchmarks.generator import generate_columns
+
+
+def validate_scalar(dates, vehicle_classes, amounts):
+    results = []
+    for date, vehicle_class, amount in zip(dates, vehicle_classes, amounts):
+        results.append(ClaimValidator.validate_claim_data(date, vehicle_class, amount))
+    return results
+
+
+def check_identical(scalar, batch):
+    valid, codes, converted = batch
+    for i, (is_valid, result) in enumerate(scalar):
+        assert bool(valid[i]) == is_valid, f"rad {i}: giltighet skiljer"
+        if is_valid:
+            assert float(converted[i]) == result, f"rad {i}: belopp skiljer"
+        else:
+            assert ERROR_MESSAGES[int(codes[i])] == result, f"rad {i}: felkod skiljer"
+            assert math.isnan(converted[i])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    columns = generate_columns(args.rows)
+
+    start = time.perf_counter()
+    scalar = validate_scalar(*columns)
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = ClaimValidator.validate_claims_batch(*columns)
+    batch_time = time.perf_counter() - start
+
+    check_identical(scalar, batch)
+
+    print(f"radvis validering: {scalar_time:8.3f} s")
+    print(f"batchvalidering:   {batch_time:8.3f} s  ({scalar_time / batch_time:.1f}x snabbare)")
+
+    if np is not None:
+        arrays = [np.asarray(column) for column in columns]
+        start = time.perf_counter()
+        batch = ClaimValidator.validate_claims_batch(*arrays)
+        array_time = time.perf_counter() - start
+        check_identical(scalar, batch)
+        print(f"batch, NumPy:      {array_time:8.3f} s  ({scalar_time / array_time:.1f}x snabbare)")
+
+    print("resultaten är identiska")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Jämför två JSON-resultat från benchmarks.run, mätning för mätning
+
+Körs från projektroten:  python -m benchmarks.compare före.json efter.json
+"""
+import argparse
+import json
+
+
+def flatten(results, prefix=""):
+    """Plattar ut nästlade resultat till {"mätning/delmätning": sekunder}"""
+    flat = {}
+    for name, value in results.items():
+        if "seconds" in value:
+            flat[prefix + name] = value["seconds"]
+        else:
+            flat.update(flatten(value, f"{prefix}{name}/"))
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+
+    print(f"före: {before.get('commit')} ({before.get('size')} rader)   "
+          f"efter: {after.get('commit')} ({after.get('size')} rader)")
+    old, new = flatten(before["results"]), flatten(after["results"])
+    for name in sorted(old.keys() & new.keys()):
+        ratio = old[name] / new[name] if new[name] else float("inf")
+        print(f"{name:<70} {old[name]:>10.4f} s {new[name]:>10.4f} s  {ratio:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Deterministisk generator av realistiska skadeanmälningar för fordonsflottor
+
+Samma seed ger alltid samma data, så att resultat kan jämföras mellan commits.
+"""
+import random
+from datetime import date, timedelta
+
+# Fordonsklass: (andel av anmälningarna, mu och sigma för lognormalfördelat belopp)
+VEHICLE_CLASS_MIX = {
+    "Car": (0.55, 9.6, 1.0),
+    "Truck": (0.15, 10.6, 1.2),
+    "Bus": (0.05, 10.9, 1.1),
+    "Motorcycle": (0.15, 9.2, 1.1),
+    "Other": (0.10, 9.4, 1.4),
+}
+
+DESCRIPTIONS = [
+    "Stenskott i vindrutan",
+    "Parkeringsskada bakre stötfångare",
+    "Kollision i korsning",
+    "Viltolycka, älg",
+    "Inbrott och stöld av utrustning",
+    "Vattenskada efter översvämning",
+    "Motorhaveri",
+    "Spräckt windshield under transport",
+    "Backade in i lastkaj",
+    "Glasskada sidoruta",
+    "",
+]
+
+SIZES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+
+def parse_size(size):
+    """Tolkar "10k"/"1m"/"10m" eller ett heltal"""
+    return SIZES.get(str(size).lower()) or int(size)
+
+
+def generate_claims(count, seed=42, start=date(2015, 1, 1), end=date(2024, 12, 31)):
+    """Genererar count anmälningar som (date, vehicle_class, claim_amount, description)
+
+    Klasserna följer VEHICLE_CLASS_MIX, beloppen är snedfördelade (lognormal)
+    och datumen är jämnt fördelade över [start, end].
+    """
+    rng = random.Random(seed)
+    classes = list(VEHICLE_CLASS_MIX)
+    weights = [VEHICLE_CLASS_MIX[name][0] for name in classes]
+    days = (end - start).days + 1
+    # Datumsträngarna förberäknas, det är många fler rader än dagar
+    date_strings = [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+    for _ in range(count):
+        vehicle_class = rng.choices(classes, weights)[0]
+        _, mu, sigma = VEHICLE_CLASS_MIX[vehicle_class]
+        amount = round(max(rng.lognormvariate(mu, sigma), 100.0), 2)
+        yield (date_strings[rng.randrange(days)], vehicle_class, amount,
+               rng.choice(DESCRIPTIONS))
+
+
+def generate_columns(count, seed=42, invalid_ratio=0.02):
+    """Genererar kolumner av rådata för validering, med invalid_ratio ogiltiga rader
+
+    Returnerar (dates, vehicle_classes, amounts) där beloppen är strängar,
+    precis som när de läses från ett formulär eller en CSV-fil.
+    """
+    rng = random.Random(seed + 1)
+    dates, vehicle_classes, amounts = [], [], []
+    for claim_date, vehicle_class, amount, _ in generate_claims(count, seed):
+        dates.append(claim_date)
+        vehicle_classes.append(vehicle_class)
+        amounts.append(f"{amount:.2f}")
+
+        roll = rng.random()
+        if roll < invalid_ratio / 4:
+            dates[-1] = claim_date[:5] + "13" + claim_date[7:]
+        elif roll < invalid_ratio / 2:
+            amounts[-1] = "tusen"
+        elif roll < invalid_ratio * 3 / 4:
+            amounts[-1] = "-" + amounts[-1]
+        elif roll < invalid_ratio:
+            vehicle_classes[-1] = ""
+    return dates, vehicle_classes, amounts
@@ -0,0 +1,100 @@
+"""Lasttest för HTTP-tjänsten: samtidiga POST /claims och latens per anrop
+
+Startar en egen tjänst mot en temporär databas om --port inte anges.
+Körs från projektroten:  python -m benchmarks.load_test_service --clients 50 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from database import DatabaseManager
+from service import ClaimsService
+from benchmarks.generator import generate_claims
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+        + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, requests, batch_size, latencies, seed):
+    generated = generate_claims(requests * batch_size, seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            claims = [dict(zip(("date", "vehicle_class", "claim_amount", "description"),
+                               next(generated)))
+                      for _ in range(batch_size)]
+            payload = claims[0] if batch_size == 1 else claims
+
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/claims", payload)
+            latencies.append(time.perf_counter() - start)
+            if status != 201:
+                raise RuntimeError(f"Oväntad status {status}")
+    finally:
+        writer.close()
+
+
+async def run(args):
+    service = None
+    host, port = args.host, args.port
+    if port is None:
+        tmp = tempfile.mkdtemp()
+        service = ClaimsService(DatabaseManager(os.path.join(tmp, "load.db")))
+        server = await service.start(host, 0)
+        port = server.sockets[0].getsockname()[1]
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, args.requests, args.batch_size, latencies, seed)
+        for seed in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    if service is not None:
+        server.close()
+        await service.stop()
+        service.db_manager.close()
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(int(p / 100 * len(latencies)), len(latencies) - 1)]
+    claims = len(latencies) * args.batch_size
+    print(f"{len(latencies)} anrop, {claims} anmälningar på {elapsed:.2f} s")
+    print(f"genomströmning: {len(latencies) / elapsed:,.0f} anrop/s, "
+          f"{claims / elapsed:,.0f} anmälningar/s")
+    print(f"latens p50: {percentile(50) * 1000:.2f} ms  p99: {percentile(99) * 1000:.2f} ms"
+          f"  medel: {statistics.mean(latencies) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Kör prestandasviten och skriver resultaten som JSON
+
+Körs från projektroten:
+    python -m benchmarks.run --size 10k --output results.json
+    python -m benchmarks.run --size 1m --only bulk_insert,filtered_queries
+
+Jämför två körningar med:  python -m benchmarks.compare före.json efter.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from database import DatabaseManager
+from validators import ClaimValidator
+from benchmarks.generator import generate_claims, generate_columns, parse_size
+
+# Högsta antal rader för mätningar som annars skulle ta orimligt lång tid
+SINGLE_INSERT_ROWS = 5_000
+FULL_FETCH_ROWS = 2_000_000
+
+FILTERS = [
+    {"vehicle_class": "Truck", "limit": 200},
+    {"date_from": "2020-01-01", "date_to": "2020-03-31", "limit": 200},
+    {"vehicle_class": "Bus", "date_from": "2019-01-01", "date_to": "2019-12-31"},
+    {"vehicle_class": "Car", "min_amount": 50_000, "limit": 100},
+]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def result(seconds, rows, **extra):
+    return dict(extra, seconds=round(seconds, 6), rows=rows,
+                rows_per_second=round(rows / seconds, 1) if seconds else None)
+
+
+def bench_single_insert(db, size, seed):
+    rows = min(size, SINGLE_INSERT_ROWS)
+    claims = list(generate_claims(rows, seed + 100))
+    seconds, _ = timed(lambda: [db.add_claim(*claim) for claim in claims])
+    return result(seconds, rows)
+
+
+def bench_bulk_insert(db, size, seed):
+    seconds, count = timed(lambda: db.add_claims_bulk(generate_claims(size, seed)))
+    return result(seconds, count)
+
+
+def bench_full_listing(db, size, seed):
+    out = {}
+    seconds, count = timed(lambda: sum(len(rows) for rows in db.iter_claims()))
+    out["iter_claims"] = result(seconds, count)
+
+    def paginate():
+        count = 0
+        page = db.get_claims_page(1000)
+        while page:
+            count += len(page)
+            page = db.get_claims_page(1000, after=(page[-1][1], page[-1][0]))
+        return count
+    seconds, count = timed(paginate)
+    out["keyset_pages"] = result(seconds, count)
+
+    if size <= FULL_FETCH_ROWS:
+        seconds, rows = timed(db.get_all_claims)
+        out["get_all_claims"] = result(seconds, len(rows))
+    return out
+
+
+def bench_filtered_queries(db, size, seed, repeat=20):
+    out = {}
+    for filters in FILTERS:
+        seconds, rows = timed(lambda: [db.query_claims(**filters) for _ in range(repeat)])
+        name = ",".join(f"{key}={value}" for key, value in filters.items())
+        out[name] = result(seconds / repeat, len(rows[0]))
+    return out
+
+
+def bench_validation(db, size, seed):
+    columns = generate_columns(size, seed)
+    out = {}
+    seconds, _ = timed(lambda: ClaimValidator.validate_claims_batch(*columns))
+    out["batch"] = result(seconds, size)
+
+    scalar_rows = min(size, 200_000)
+    sample = [column[:scalar_rows] for column in columns]
+    seconds, _ = timed(lambda: [ClaimValidator.validate_claim_data(*row) for row in zip(*sample)])
+    out["scalar"] = result(seconds, scalar_rows)
+    return out
+
+
+# Ordningen spelar roll: listning och frågor mäts mot data från bulk_insert
+BENCHMARKS = {
+    "single_insert": bench_single_insert,
+    "bulk_insert": bench_bulk_insert,
+    "full_listing": bench_full_listing,
+    "filtered_queries": bench_filtered_queries,
+    "validation": bench_validation,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(size, seed=42, only=None):
+    names = only or list(BENCHMARKS)
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "size": size,
+        "seed": seed,
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Utan frågecache, annars mäter upprepade frågor bara cacheträffar
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), query_cache_entries=0)
+        # Mätningarna som läser data behöver en fylld databas
+        if "bulk_insert" not in names and any(name != "single_insert" for name in names):
+            db.add_claims_bulk(generate_claims(size, seed))
+
+        for name in BENCHMARKS:
+            if name not in names:
+                continue
+            print(f"kör {name}...", file=sys.stderr, flush=True)
+            report["results"][name] = BENCHMARKS[name](db, size, seed)
+        db.close()
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="10k", help="10k, 1m, 10m eller ett antal rader")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="kommaseparerad lista, t.ex. bulk_insert,validation")
+    parser.add_argument("--output", help="fil att skriva JSON-resultatet till")
+    args = parser.parse_args()
+
+    only = args.only.split(",") if args.only else None
+    unknown = set(only or []) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"okända mätningar: {', '.join(sorted(unknown))}")
+
+    report = run(parse_size(args.size), args.seed, only)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Stresstest: flera processer skriver samtidigt till samma databas
+
+Varje process skriver sina anmälningar i små transaktioner, direkt eller
+via en GroupCommitWriter med flera trådar. Efteråt kontrolleras att varje
+anmälan finns exakt en gång och att statistiken stämmer.
+
+Körs från projektroten:
+    python -m benchmarks.stress_writers --processes 4 --claims 5000
+    python -m benchmarks.stress_writers --processes 4 --threads 8 --group-commit
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from database import DatabaseManager
+from group_commit import GroupCommitWriter
+from benchmarks.generator import generate_claims
+
+
+def worker_claims(worker, count, batch_size):
+    """Anmälningar för en process, med beskrivningar som är unika över alla processer"""
+    claims = [(claim_date, vehicle_class, amount, f"p{worker}-{i}")
+              for i, (claim_date, vehicle_class, amount, _)
+              in enumerate(generate_claims(count, seed=worker))]
+    return [claims[i:i + batch_size] for i in range(0, count, batch_size)]
+
+
+def write_claims(path, worker, count, batch_size, threads, group_commit, start_event):
+    db = DatabaseManager(path, query_cache_entries=0)
+    batches = worker_claims(worker, count, batch_size)
+    writer = GroupCommitWriter(db) if group_commit else None
+    write = writer.add_claims if writer else db.add_claims_bulk
+
+    def run(part):
+        for batch in part:
+            write(batch)
+
+    start_event.wait()
+    workers = [threading.Thread(target=run, args=(batches[i::threads],))
+               for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if writer:
+        writer.stop()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=1, help="skrivtrådar per process")
+    parser.add_argument("--claims", type=int, default=5_000, help="anmälningar per process")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="anmälningar per skrivning")
+    parser.add_argument("--group-commit", action="store_true",
+                        help="skriv via en GroupCommitWriter i varje process")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stress.db")
+        DatabaseManager(path).close()
+
+        start_event = multiprocessing.Event()
+        processes = [
+            multiprocessing.Process(target=write_claims, args=(
+                path, worker, args.claims, args.batch_size, args.threads,
+                args.group_commit, start_event))
+            for worker in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        start = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+
+        failed = [process.pid for process in processes if process.exitcode != 0]
+        if failed:
+            raise SystemExit(f"processer avslutades med fel: {failed}")
+
+        db = DatabaseManager(path, query_cache_entries=0)
+        expected = args.processes * args.claims
+        conn = db.get_connection()
+        count, distinct = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT description) FROM claims").fetchone()
+        stats_count = sum(row["count"] for row in db.get_class_statistics())
+        db.close()
+
+    assert count == expected, f"{count} anmälningar, förväntade {expected}"
+    assert distinct == expected, f"{expected - distinct} dubbletter"
+    assert stats_count == expected, f"statistiken räknar {stats_count}, förväntade {expected}"
+    print(f"{expected} anmälningar från {args.processes} processer på {elapsed:.2f} s "
+          f"({expected / elapsed:.0f} anmälningar/s), inga förlorade")
+
+
+if __name__ == "__main__":
+    main()
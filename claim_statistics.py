@@ -0,0 +1,170 @@
+class ClaimStatistics:
+    """Statistik per fordonsklass som hålls uppdaterad i sammanfattningstabeller
+
+    Tabellerna uppdateras i samma transaktion som skadeanmälningarna skrivs,
+    så att statistiken kan läsas utan att gå igenom hela claims-tabellen.
+    """
+
+    @staticmethod
+    def create_tables(conn):
+        """Skapar sammanfattningstabellerna om de inte finns"""
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS claim_stats (
+            vehicle_class TEXT PRIMARY KEY,
+            claim_count INTEGER NOT NULL,
+            total_amount REAL NOT NULL,
+            total_squares REAL NOT NULL,
+            min_amount REAL NOT NULL,
+            max_amount REAL NOT NULL
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS claim_stats_monthly (
+            vehicle_class TEXT NOT NULL,
+            month TEXT NOT NULL,
+            claim_count INTEGER NOT NULL,
+            total_amount REAL NOT NULL,
+            total_squares REAL NOT NULL,
+            min_amount REAL NOT NULL,
+            max_amount REAL NOT NULL,
+            PRIMARY KEY (vehicle_class, month)
+        ) WITHOUT ROWID
+        """)
+
+    @staticmethod
+    def drop_tables(conn):
+        conn.execute("DROP TABLE IF EXISTS claim_stats")
+        conn.execute("DROP TABLE IF EXISTS claim_stats_monthly")
+
+    @staticmethod
+    def record_claims(conn, claims):
+        """Lägger till nya skadeanmälningar i statistiken
+
+        claims är (date, vehicle_class, claim_amount, ...)-tupler. Raderna
+        summeras först i minnet så att varje klass och månad bara skrivs en gång.
+        """
+        totals = {}
+        monthly = {}
+        for claim in claims:
+            date, vehicle_class, amount = claim[0], claim[1], float(claim[2])
+            for groups, key in ((totals, vehicle_class), (monthly, (vehicle_class, date[:7]))):
+                group = groups.get(key)
+                if group is None:
+                    groups[key] = [1, amount, amount * amount, amount, amount]
+                else:
+                    group[0] += 1
+                    group[1] += amount
+                    group[2] += amount * amount
+                    group[3] = min(group[3], amount)
+                    group[4] = max(group[4], amount)
+
+        update = """
+        DO UPDATE SET
+            claim_count = claim_count + excluded.claim_count,
+            total_amount = total_amount + excluded.total_amount,
+            total_squares = total_squares + excluded.total_squares,
+            min_amount = MIN(min_amount, excluded.min_amount),
+            max_amount = MAX(max_amount, excluded.max_amount)
+        """
+        conn.executemany(f"""
+        INSERT INTO claim_stats VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (vehicle_class) {update}
+        """, [(key, *group) for key, group in totals.items()])
+        conn.executemany(f"""
+        INSERT INTO claim_stats_monthly VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (vehicle_class, month) {update}
+        """, [(*key, *group) for key, group in monthly.items()])
+
+    @staticmethod
+    def remove_duplicates(conn, claims):
+        """Räknar bort borttagna dubbletter ur statistiken
+
+        Originalet med samma klass, månad och belopp finns kvar, så min och
+        max påverkas inte; bara antal, summa och kvadratsumma räknas ned.
+        """
+        totals = {}
+        monthly = {}
+        for claim in claims:
+            date, vehicle_class, amount = claim[0], claim[1], float(claim[2])
+            for groups, key in ((totals, vehicle_class), (monthly, (vehicle_class, date[:7]))):
+                group = groups.setdefault(key, [0, 0.0, 0.0])
+                group[0] += 1
+                group[1] += amount
+                group[2] += amount * amount
+
+        update = """
+        SET claim_count = claim_count - ?, total_amount = total_amount - ?,
+            total_squares = total_squares - ?
+        """
+        conn.executemany(f"UPDATE claim_stats {update} WHERE vehicle_class = ?",
+                         [(*group, key) for key, group in totals.items()])
+        conn.executemany(
+            f"UPDATE claim_stats_monthly {update} WHERE vehicle_class = ? AND month = ?",
+            [(*group, *key) for key, group in monthly.items()])
+
+    @staticmethod
+    def clear(conn):
+        conn.execute("DELETE FROM claim_stats")
+        conn.execute("DELETE FROM claim_stats_monthly")
+
+    @staticmethod
+    def rebuild(conn):
+        """Räknar om statistiken från claims-tabellen"""
+        ClaimStatistics.clear(conn)
+        # Beloppen lagras i öre och datumen som dagar sedan 1970-01-01
+        conn.execute("""
+        INSERT INTO claim_stats
+        SELECT v.name, COUNT(*), SUM(c.amount_ore) / 100.0,
+               SUM(CAST(c.amount_ore AS REAL) * c.amount_ore) / 10000.0,
+               MIN(c.amount_ore) / 100.0, MAX(c.amount_ore) / 100.0
+        FROM claims AS c JOIN vehicle_classes AS v ON v.vehicle_class_id = c.vehicle_class_id
+        GROUP BY v.name
+        """)
+        conn.execute("""
+        INSERT INTO claim_stats_monthly
+        SELECT v.name, strftime('%Y-%m', c.day * 86400, 'unixepoch') AS month, COUNT(*),
+               SUM(c.amount_ore) / 100.0,
+               SUM(CAST(c.amount_ore AS REAL) * c.amount_ore) / 10000.0,
+               MIN(c.amount_ore) / 100.0, MAX(c.amount_ore) / 100.0
+        FROM claims AS c JOIN vehicle_classes AS v ON v.vehicle_class_id = c.vehicle_class_id
+        GROUP BY v.name, month
+        """)
+
+    @staticmethod
+    def get_class_statistics(conn):
+        """Returnerar antal, summa, medel, min, max och varians per fordonsklass"""
+        rows = conn.execute("""
+        SELECT vehicle_class, claim_count, total_amount, total_squares, min_amount, max_amount
+        FROM claim_stats ORDER BY vehicle_class
+        """).fetchall()
+        return [ClaimStatistics.summarize(row[1:], vehicle_class=row[0]) for row in rows]
+
+    @staticmethod
+    def get_monthly_statistics(conn, vehicle_class=None):
+        """Returnerar samma mått per fordonsklass och månad (YYYY-MM)"""
+        sql = """
+        SELECT vehicle_class, month, claim_count, total_amount, total_squares,
+               min_amount, max_amount
+        FROM claim_stats_monthly
+        """
+        params = []
+        if vehicle_class is not None:
+            sql += " WHERE vehicle_class = ?"
+            params.append(vehicle_class)
+        sql += " ORDER BY vehicle_class, month"
+
+        rows = conn.execute(sql, params).fetchall()
+        return [ClaimStatistics.summarize(row[2:], vehicle_class=row[0], month=row[1])
+                for row in rows]
+
+    @staticmethod
+    def summarize(aggregates, **keys):
+        """Räknar fram medel och varians ur (antal, summa, kvadratsumma, min, max)"""
+        count, total, squares, minimum, maximum = aggregates
+        mean = total / count
+        # Stickprovsvarians ur summan och kvadratsumman
+        variance = None
+        if count > 1:
+            variance = max((squares - total * total / count) / (count - 1), 0.0)
+        return dict(keys, count=count, sum=total, mean=mean, min=minimum, max=maximum,
+                    variance=variance)
@@ -1,48 +1,261 @@
+import logging
 import tkinter as tk
-from tkinter import ttk
+from collections import deque
+from tkinter import ttk, messagebox
+
+from metrics import METRICS
+
+error_log = logging.getLogger("claims.gui")
+
+
+def show_error(error):
+    """Visar ett oväntat fel för användaren, och räknar och loggar det först"""
+    METRICS.increment("claims_errors_total", source="gui")
+    error_log.error("Ett fel uppstod: %s", error, exc_info=error)
+    messagebox.showerror("Fel", f"Ett fel uppstod: {str(error)}")
+
 
 class ClaimsWindow:
-    def __init__(self, parent, db_manager):
+    def __init__(self, parent, db_manager, worker=None):
         self.parent = parent
         self.db_manager = db_manager
-        
+        # Med en DatabaseWorker hämtas sidorna i bakgrunden
+        self.worker = worker
+
     def show_all_claims(self):
         """Visar alla skadeanmälningar i ett nytt fönster"""
         try:
-            rows = self.db_manager.get_all_claims()
-            
             # Skapa nytt fönster
             claims_window = tk.Toplevel(self.parent)
             claims_window.title("Alla Skadeanmälningar")
             claims_window.geometry("800x400")
-            
-            # Skapa trädvy för att visa data
-            tree = ttk.Treeview(claims_window, 
-                              columns=("ID", "Datum", "Fordonsklass", "Belopp", "Beskrivning"), 
-                              show="headings")
-            
-            # Konfigurera kolumner
-            tree.heading("ID", text="ID")
-            tree.heading("Datum", text="Datum")
-            tree.heading("Fordonsklass", text="Fordonsklass")
-            tree.heading("Belopp", text="Belopp (SEK)")
-            tree.heading("Beskrivning", text="Beskrivning")
-            
-            tree.column("ID", width=50)
-            tree.column("Datum", width=100)
-            tree.column("Fordonsklass", width=100)
-            tree.column("Belopp", width=100)
-            tree.column("Beskrivning", width=350)
-            
-            # Lägg till data
-            for row in rows:
-                tree.insert("", tk.END, values=row)
-            
-            tree.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
-            
+
+            # Sökruta för fritextsökning i beskrivningarna
+            search_frame = ttk.Frame(claims_window)
+            search_frame.pack(fill=tk.X, padx=10, pady=(10, 0))
+            ttk.Label(search_frame, text="Sök i beskrivning:").pack(side=tk.LEFT)
+            search_text = tk.StringVar()
+            ttk.Entry(search_frame, textvariable=search_text, width=40).pack(side=tk.LEFT, padx=5)
+
+            # Lista som laddar raderna sida för sida medan användaren scrollar
+            claims_list = VirtualClaimsList(claims_window, self.db_manager, self.worker)
+            claims_list.frame.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
+            claims_list.load_first_page()
+            search_text.trace_add("write", lambda *args: claims_list.search(search_text.get()))
+
             # Lägg till knapp för att stänga
-            ttk.Button(claims_window, text="Stäng", 
+            ttk.Button(claims_window, text="Stäng",
                       command=claims_window.destroy).pack(pady=10)
-            
+
         except Exception as e:
-            raise e
\ No newline at end of file
+            raise e
+
+
+class VirtualClaimsList:
+    """Trädvy som bara håller ett begränsat fönster av rader i minnet
+
+    Rader hämtas med keyset-paginering när användaren närmar sig början eller
+    slutet av listan, och rader längst bort från vyn tas bort igen. Med en
+    DatabaseWorker görs hämtningarna i bakgrunden och avbryts om fönstret stängs.
+
+    Med search() visas istället träffarna från en fritextsökning; sökningen
+    körs först när användaren slutat skriva i search_delay millisekunder.
+    """
+
+    def __init__(self, parent, db_manager, worker=None, page_size=200, max_rows=1000,
+                 search_delay=300, search_limit=500):
+        self.db_manager = db_manager
+        self.worker = worker
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.search_delay = search_delay
+        self.search_limit = search_limit
+        self._task = None
+        self._closed = False
+        self._search_after_id = None
+
+        # Nycklar (date, claim_id) för raderna i trädvyn, i visningsordning
+        self.keys = deque()
+        self.at_start = True
+        self.at_end = False
+        self._loading = False
+
+        self.frame = ttk.Frame(parent)
+
+        # Skapa trädvy för att visa data
+        self.tree = ttk.Treeview(self.frame,
+                                 columns=("ID", "Datum", "Fordonsklass", "Belopp", "Beskrivning"),
+                                 show="headings")
+
+        # Konfigurera kolumner
+        self.tree.heading("ID", text="ID")
+        self.tree.heading("Datum", text="Datum")
+        self.tree.heading("Fordonsklass", text="Fordonsklass")
+        self.tree.heading("Belopp", text="Belopp (SEK)")
+        self.tree.heading("Beskrivning", text="Beskrivning")
+
+        self.tree.column("ID", width=50)
+        self.tree.column("Datum", width=100)
+        self.tree.column("Fordonsklass", width=100)
+        self.tree.column("Belopp", width=100)
+        self.tree.column("Beskrivning", width=350)
+
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+
+        self.tree.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.frame.bind("<Destroy>", self._on_destroy)
+
+    def load_first_page(self):
+        """Tömmer listan och laddar den första sidan"""
+        self.tree.delete(*self.tree.get_children())
+        self.keys.clear()
+        self.at_start = True
+        self._loading = True
+        self._fetch(self._on_first_page)
+
+    def search(self, text):
+        """Visar träffarna för text, eller alla anmälningar om text är tom
+
+        Anropas vid varje tangenttryckning; bara den sista sökningen körs.
+        """
+        if self._search_after_id is not None:
+            self.tree.after_cancel(self._search_after_id)
+        self._search_after_id = self.tree.after(self.search_delay, self._run_search, text)
+
+    def _run_search(self, text):
+        self._search_after_id = None
+        # En tidigare hämtning eller sökning är inte längre intressant
+        if self._task is not None:
+            self._task.cancel()
+        if not text.strip():
+            self.load_first_page()
+            return
+
+        self.tree.delete(*self.tree.get_children())
+        self.keys.clear()
+        # Träfflistan bläddras inte, den visas i sin helhet
+        self.at_start = self.at_end = True
+        self._loading = True
+        self._call(self._on_search_results, self.db_manager.search_claims, text,
+                   limit=self.search_limit)
+
+    def _on_search_results(self, rows):
+        if self._closed:
+            return
+        self._append_rows(rows)
+        self._loading = False
+
+    def _fetch(self, callback, **key):
+        """Hämtar en sida, i bakgrunden om det finns en worker"""
+        self._call(callback, self.db_manager.get_claims_page, self.page_size, **key)
+
+    def _call(self, callback, func, *args, **kwargs):
+        if self.worker is None:
+            try:
+                rows = func(*args, **kwargs)
+            except Exception as e:
+                self._on_error(e)
+                return
+            callback(rows)
+            return
+        self._task = self.worker.submit(func, *args, on_done=callback,
+                                        on_error=self._on_error, **kwargs)
+
+    def _on_scroll(self, first, last):
+        """Uppdaterar scrollbaren och laddar mer data nära kanterna"""
+        self.scrollbar.set(first, last)
+        if self._loading or not self.keys:
+            return
+        if float(last) >= 0.9 and not self.at_end:
+            self._loading = True
+            self.tree.after_idle(
+                lambda: self._fetch(self._on_next_page, after=self.keys[-1]))
+        elif float(first) <= 0.1 and not self.at_start:
+            self._loading = True
+            self.tree.after_idle(
+                lambda: self._fetch(self._on_previous_page, before=self.keys[0]))
+
+    def _on_first_page(self, rows):
+        if self._closed:
+            return
+        self.at_end = len(rows) < self.page_size
+        self._append_rows(rows)
+        self._loading = False
+
+    def _on_next_page(self, rows):
+        if self._closed:
+            return
+        self.at_end = len(rows) < self.page_size
+        if rows:
+            top = self._top_index()
+            self._append_rows(rows)
+            removed = self._trim(from_start=True)
+            self._scroll_to_index(top - removed)
+        self._loading = False
+
+    def _on_previous_page(self, rows):
+        if self._closed:
+            return
+        self.at_start = len(rows) < self.page_size
+        if rows:
+            top = self._top_index()
+            self._prepend_rows(rows)
+            self._trim(from_start=False)
+            self._scroll_to_index(top + len(rows))
+        self._loading = False
+
+    def _on_error(self, error):
+        self._loading = False
+        if not self._closed:
+            show_error(error)
+
+    def _on_destroy(self, event):
+        """Avbryter en pågående hämtning när fönstret stängs"""
+        if event.widget is not self.frame:
+            return
+        self._closed = True
+        if self._search_after_id is not None:
+            self.tree.after_cancel(self._search_after_id)
+        if self._task is not None:
+            self._task.cancel()
+
+    def _append_rows(self, rows):
+        with METRICS.timer("claims_operation_seconds", operation="treeview"):
+            for row in rows:
+                self.tree.insert("", tk.END, iid=str(row[0]), values=row)
+                self.keys.append((row[1], row[0]))
+
+    def _prepend_rows(self, rows):
+        with METRICS.timer("claims_operation_seconds", operation="treeview"):
+            for row in reversed(rows):
+                self.tree.insert("", 0, iid=str(row[0]), values=row)
+                self.keys.appendleft((row[1], row[0]))
+
+    def _trim(self, from_start):
+        """Tar bort rader utanför fönstret på max_rows rader, returnerar antalet"""
+        excess = len(self.keys) - self.max_rows
+        if excess <= 0:
+            return 0
+
+        children = self.tree.get_children()
+        if from_start:
+            self.tree.delete(*children[:excess])
+            for _ in range(excess):
+                self.keys.popleft()
+            self.at_start = False
+        else:
+            self.tree.delete(*children[-excess:])
+            for _ in range(excess):
+                self.keys.pop()
+            self.at_end = False
+        return excess
+
+    def _top_index(self):
+        """Index för översta synliga raden"""
+        return int(round(self.tree.yview()[0] * len(self.keys)))
+
+    def _scroll_to_index(self, index):
+        if self.keys:
+            self.tree.yview_moveto(max(index, 0) / len(self.keys))
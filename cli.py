@@ -0,0 +1,264 @@
+"""Kommandorad för skadeanmälningar utan GUI
+
+    python cli.py add 2024-01-15 Car 12500 --description "Plåtskada"
+    python cli.py import skador.csv --rejects avvisade.csv
+    python cli.py list --vehicle-class Truck --from 2024-01-01 --limit 50
+    python cli.py stats --monthly
+    python cli.py export claims.csv.gz
+    python cli.py bench --size 100k --only bulk_insert
+
+Kommandona går genom samma datalager som GUI:t och tjänsten (DatabaseManager,
+ClaimValidator, ClaimImporter och export.py) men importerar aldrig tkinter.
+Med --time skrivs körtiden till stderr, så att schemalagda jobb kan mätas.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+from database import DatabaseBusyError, DatabaseManager
+from metrics import METRICS
+
+# Exportformat efter filändelse; .gz komprimerar csv
+EXPORT_FORMATS = {
+    ".csv": "csv",
+    ".xlsx": "xlsx",
+    ".parquet": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+}
+
+
+class CommandError(Exception):
+    """Fel som visas för användaren utan stackspårning"""
+
+
+def cmd_add(db_manager, args):
+    from validators import ClaimValidator
+
+    is_valid, result = ClaimValidator.validate_claim_data(args.date, args.vehicle_class,
+                                                          args.amount)
+    if not is_valid:
+        raise CommandError(result)
+    claim_id, inserted = db_manager.add_claim(args.date, args.vehicle_class, result,
+                                              args.description,
+                                              idempotency_key=args.idempotency_key,
+                                              return_inserted=True)
+    print(claim_id)
+    if not inserted:
+        print(f"Anmälan är redan registrerad (ID {claim_id}) och lagrades inte igen; "
+              "ange en annan --description om det är en ny skada", file=sys.stderr)
+
+
+def cmd_import(db_manager, args):
+    from importer import ClaimImporter
+
+    importer = ClaimImporter(db_manager, chunk_size=args.chunk_size)
+    if args.path.lower().endswith((".xlsx", ".xlsm")):
+        result = importer.import_excel(args.path, args.sheet, reject_file=args.rejects)
+    else:
+        result = importer.import_csv(args.path, delimiter=args.delimiter,
+                                     reject_file=args.rejects)
+
+    print(f"{result.imported} lagrade, {result.rejected} avvisade, "
+          f"{result.duplicates} fanns redan")
+    for line_number, message in result.rejects[:args.show_rejects]:
+        print(f"rad {line_number}: {message}", file=sys.stderr)
+    if result.rejected > args.show_rejects:
+        print(f"... och {result.rejected - args.show_rejects} till", file=sys.stderr)
+
+
+def cmd_list(db_manager, args):
+    from export import CLAIM_COLUMNS
+    from validators import ClaimValidator
+
+    for value in (args.date_from, args.date_to):
+        if value is not None:
+            is_valid, message = ClaimValidator.validate_date(value)
+            if not is_valid:
+                raise CommandError(message)
+
+    limit = args.limit or None
+    if args.search:
+        rows = db_manager.search_claims(args.search, args.vehicle_class, args.date_from,
+                                        args.date_to, limit=limit)
+    elif limit is None and not any((args.vehicle_class, args.date_from, args.date_to,
+                                    args.min_amount)):
+        # Hela tabellen strömmas omgång för omgång istället för att läsas in i minnet
+        rows = (row for chunk in db_manager.iter_claims() for row in chunk)
+    else:
+        rows = db_manager.query_claims(args.vehicle_class, args.date_from, args.date_to,
+                                       args.min_amount, limit)
+
+    writer = csv.writer(sys.stdout, delimiter=args.delimiter)
+    writer.writerow(CLAIM_COLUMNS)
+    writer.writerows(rows)
+
+
+def cmd_stats(db_manager, args):
+    from export import STATISTICS_COLUMNS
+
+    columns = STATISTICS_COLUMNS
+    if args.monthly:
+        statistics = db_manager.get_monthly_statistics(args.vehicle_class)
+        columns = columns[:1] + ["month"] + columns[1:]
+    else:
+        statistics = db_manager.get_class_statistics()
+
+    if args.json:
+        json.dump(statistics, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return
+
+    writer = csv.writer(sys.stdout, delimiter=args.delimiter)
+    writer.writerow(columns)
+    writer.writerows([row[column] for column in columns] for row in statistics)
+
+
+def cmd_export(db_manager, args):
+    import export
+
+    path = args.path
+    compression = "gzip" if path.lower().endswith(".gz") else None
+    name = path[:-3] if compression else path
+    extension = name[name.rfind("."):].lower() if "." in name else ""
+    export_format = args.format or EXPORT_FORMATS.get(extension)
+    if export_format is None:
+        raise CommandError(f"Okänt exportformat för {path}; ange --format")
+    if compression and export_format not in ("csv", "statistics"):
+        raise CommandError("Bara csv och statistics kan gzip-komprimeras")
+
+    if export_format == "csv":
+        rows = export.export_csv(db_manager, path, args.chunksize, compression)
+    elif export_format == "statistics":
+        rows = export.export_statistics_csv(db_manager, path, args.monthly, compression)
+    elif export_format == "xlsx":
+        rows = export.export_xlsx(db_manager, path, args.chunksize)
+    elif export_format == "parquet":
+        rows = export.export_parquet(db_manager, path, args.chunksize)
+    else:
+        rows = export.export_feather(db_manager, path, args.chunksize)
+    print(f"{rows} rader skrivna till {path}")
+
+
+def cmd_bench(args):
+    # Mätningarna körs mot en egen, tillfällig databas
+    from benchmarks import run
+    from benchmarks.generator import parse_size
+
+    only = args.only.split(",") if args.only else None
+    unknown = set(only or []) - set(run.BENCHMARKS)
+    if unknown:
+        raise CommandError(f"Okända mätningar: {', '.join(sorted(unknown))}")
+
+    report = run.run(parse_size(args.size), args.seed, only)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="claims.db")
+    parser.add_argument("--slow-query-ms", type=float,
+                        help="logga SQL-satser som tar längre tid än så här")
+    parser.add_argument("--time", action="store_true", help="skriv körtiden till stderr")
+    parser.add_argument("--metrics", help="fil att skriva latens och räknare till när "
+                                          "kommandot är klart (.json, annars Prometheus-text)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="lägg till en skadeanmälan")
+    add.add_argument("date", help="YYYY-MM-DD")
+    add.add_argument("vehicle_class")
+    add.add_argument("amount")
+    add.add_argument("--description", default="")
+    add.add_argument("--idempotency-key",
+                     help="samma nyckel ger samma anmälan om kommandot körs igen")
+    add.set_defaults(func=cmd_add)
+
+    import_ = commands.add_parser("import", help="importera en CSV- eller Excel-fil")
+    import_.add_argument("path")
+    import_.add_argument("--sheet", help="Excel-blad (standard: det aktiva)")
+    import_.add_argument("--delimiter", default=",")
+    import_.add_argument("--rejects", help="CSV-fil för avvisade rader")
+    import_.add_argument("--chunk-size", type=int, default=5000)
+    import_.add_argument("--show-rejects", type=int, default=10,
+                         help="antal avvisade rader att visa")
+    import_.set_defaults(func=cmd_import)
+
+    list_ = commands.add_parser("list", help="skriv anmälningar som CSV till stdout")
+    list_.add_argument("--vehicle-class")
+    list_.add_argument("--from", dest="date_from", help="YYYY-MM-DD")
+    list_.add_argument("--to", dest="date_to", help="YYYY-MM-DD")
+    list_.add_argument("--min-amount", type=float)
+    list_.add_argument("--search", help="fritextsökning i beskrivningen")
+    list_.add_argument("--limit", type=int, default=100, help="0 för alla rader")
+    list_.add_argument("--delimiter", default=",")
+    list_.set_defaults(func=cmd_list)
+
+    stats = commands.add_parser("stats", help="statistik per fordonsklass")
+    stats.add_argument("--monthly", action="store_true", help="per klass och månad")
+    stats.add_argument("--vehicle-class", help="bara den här klassen (med --monthly)")
+    stats.add_argument("--json", action="store_true")
+    stats.add_argument("--delimiter", default=",")
+    stats.set_defaults(func=cmd_stats)
+
+    export = commands.add_parser("export", help="exportera till csv, xlsx, parquet eller feather")
+    export.add_argument("path", help="formatet väljs efter filändelsen; .gz komprimerar csv")
+    export.add_argument("--format", choices=sorted(set(EXPORT_FORMATS.values()) | {"statistics"}))
+    export.add_argument("--monthly", action="store_true",
+                        help="statistik per månad (med --format statistics)")
+    export.add_argument("--chunksize", type=int, default=100000)
+    export.set_defaults(func=cmd_export)
+
+    bench = commands.add_parser("bench", help="kör prestandasviten (benchmarks.run)")
+    bench.add_argument("--size", default="10k", help="10k, 1m, 10m eller ett antal rader")
+    bench.add_argument("--seed", type=int, default=42)
+    bench.add_argument("--only", help="kommaseparerad lista, t.ex. bulk_insert,validation")
+    bench.add_argument("--output", help="fil att skriva JSON-resultatet till")
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def run_command(args):
+    if args.command == "bench":
+        args.func(args)
+        return
+
+    db_manager = DatabaseManager(args.db, slow_query_ms=args.slow_query_ms)
+    try:
+        args.func(db_manager, args)
+    finally:
+        db_manager.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.slow_query_ms is not None:
+        logging.basicConfig(level=logging.WARNING)
+
+    start = time.perf_counter()
+    try:
+        run_command(args)
+    except BrokenPipeError:
+        # t.ex. python cli.py list | head; resten av utdata kastas
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except (CommandError, DatabaseBusyError, ImportError, OSError, ValueError) as e:
+        print(f"Fel: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.time:
+            print(f"{args.command}: {time.perf_counter() - start:.3f} s", file=sys.stderr)
+        if args.metrics:
+            METRICS.write(args.metrics)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,84 +1,993 @@
+import heapq
+import logging
+import os
+import random
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date as date_type, datetime
+from functools import lru_cache
+from itertools import islice
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+from claim_statistics import ClaimStatistics
+from metrics import METRICS
+from query_cache import QueryCache
+import archive
+import dedup
+import migrations
+
+# Datum lagras som antal dagar sedan 1970-01-01
+EPOCH_ORDINAL = date_type(1970, 1, 1).toordinal()
+
+# Raderna läses i lagringsformatet och avkodas i _decode_rows till samma form
+# som tidigare: (claim_id, "YYYY-MM-DD", fordonsklass, belopp i kronor, beskrivning)
+CLAIM_COLUMNS = "c.claim_id, c.day, c.vehicle_class_id, c.amount_ore, c.description"
+CLAIM_SELECT = f"""
+SELECT {CLAIM_COLUMNS}
+FROM claims AS c
+"""
+
+# Sorteringar som query_claims stöder; båda kan läsas direkt ur datumindexen
+QUERY_ORDERS = {
+    "date_desc": "c.day DESC, c.claim_id DESC",
+    "date_asc": "c.day ASC, c.claim_id ASC",
+}
+
+# ON CONFLICT DO NOTHING: en dubblett (samma content_hash eller idempotency_key)
+# hoppas över istället för att avbryta transaktionen, se dedup.py
+INSERT_CLAIM = """
+INSERT INTO claims (day, vehicle_class_id, amount_ore, description, content_hash, idempotency_key)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT DO NOTHING
+"""
+
+# Samma sats med claim_id satt, se _first_free_claim_id
+INSERT_CLAIM_WITH_ID = """
+INSERT INTO claims
+    (claim_id, day, vehicle_class_id, amount_ore, description, content_hash, idempotency_key)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT DO NOTHING
+"""
+
+# Sortering -> (nyckel, fallande) för att slå ihop rader från flera partitioner
+MERGE_KEYS = {
+    "c.day DESC, c.claim_id DESC": (lambda row: (row[1], row[0]), True),
+    "c.day ASC, c.claim_id ASC": (lambda row: (row[1], row[0]), False),
+    "c.day DESC": (lambda row: row[1], True),
+    "c.claim_id": (lambda row: row[0], False),
+    "rank": (lambda row: row[5], False),
+}
+
+
+@lru_cache(maxsize=8192)
+def date_to_day(date_string):
+    """'YYYY-MM-DD' -> dagar sedan 1970-01-01"""
+    return datetime.strptime(date_string, "%Y-%m-%d").toordinal() - EPOCH_ORDINAL
+
+
+def day_to_date(day):
+    """Dagar sedan 1970-01-01 -> 'YYYY-MM-DD'"""
+    return date_type.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+
+def amount_to_ore(amount):
+    """Belopp i kronor -> heltal öre"""
+    return int(round(float(amount) * 100))
+
+
+class _Lookup(dict):
+    """Ordbok som fyller på saknade nycklar med load(nyckel)"""
+
+    def __init__(self, load):
+        super().__init__()
+        self._load = load
+
+    def __missing__(self, key):
+        value = self[key] = self._load(key)
+        return value
+
+
+# Det finns betydligt färre dagar än rader, så datumsträngarna återanvänds
+_DATE_STRINGS = _Lookup(day_to_date)
+
+slow_query_log = logging.getLogger("claims.slow_queries")
+
+
+class DatabaseBusyError(sqlite3.OperationalError):
+    """En annan process har hållit skrivlåset längre än vi väntat"""
+
+
+def is_busy_error(error):
+    """True om felet betyder att databasen är låst av en annan anslutning"""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(error) or "busy" in str(error)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3-anslutning som mäter tiden för execute och executemany
+
+    För en SELECT mäts tiden fram till första raden; resten räknas som
+    "fetch" där raderna läses. Med slow_query_seconds loggas satser som tar
+    längre tid, med parametrarna insatta via sqlite3:s trace-callback.
+    """
+
+    def instrument(self, metrics, slow_query_seconds=None):
+        self._execute_time = metrics.histogram("claims_operation_seconds", operation="execute")
+        self._executemany_time = metrics.histogram("claims_operation_seconds",
+                                                    operation="executemany")
+        self._errors = metrics.counter("claims_errors_total", source="database")
+        self._slow_queries = metrics.counter("claims_slow_queries_total")
+        self._slow_query_seconds = slow_query_seconds
+        self._statement = None
+        if slow_query_seconds is not None:
+            self.set_trace_callback(self._trace)
+
+    def _trace(self, statement):
+        # Första satsen efter execute, inte satser som triggers kör
+        if self._statement is None:
+            self._statement = statement
+
+    def execute(self, sql, parameters=()):
+        return self._timed(self._execute_time, super().execute, sql, parameters)
+
+    def executemany(self, sql, parameters):
+        # Första radens parametrar säger inget om en hel omgång, så mallen loggas
+        return self._timed(self._executemany_time, super().executemany, sql, parameters,
+                           expand=False)
+
+    def _timed(self, histogram, method, sql, parameters, expand=True):
+        self._statement = None
+        start = time.perf_counter()
+        try:
+            return method(sql, parameters)
+        except sqlite3.Error:
+            self._errors.increment()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            histogram.observe(elapsed)
+            if self._slow_query_seconds is not None and elapsed >= self._slow_query_seconds:
+                self._slow_queries.increment()
+                statement = self._statement if expand and self._statement else sql
+                slow_query_log.warning("Långsam fråga (%.1f ms): %s", elapsed * 1000,
+                                       " ".join(statement.split()))
+
+
+def _attach_limit(conn):
+    """Hur många filer som kan kopplas in med ATTACH (oftast 10)"""
+    try:
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    except AttributeError:
+        # getlimit finns från Python 3.11
+        return 10
+
 
 class DatabaseManager:
-    def __init__(self, db_name="claims.db"):
+    def __init__(self, db_name="claims.db", synchronous="NORMAL", cache_size=-20000,
+                 query_cache_entries=256, query_cache_rows=100000, metrics=None,
+                 slow_query_ms=None, busy_timeout=5.0, busy_retries=3, retry_delay=0.05,
+                 archive_dir=None):
         self.db_name = db_name
+        # Arkivfilerna från archive_claims hamnar som standard bredvid databasen
+        self.archive_dir = archive_dir or os.path.dirname(os.path.abspath(db_name))
+        # PRAGMA-inställningar som används för varje ny anslutning
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+
+        # Flera skrivare: SQLite väntar själv upp till busy_timeout sekunder på
+        # skrivlåset, därefter görs busy_retries nya försök med ökande paus
+        self.busy_timeout = busy_timeout
+        self.busy_retries = busy_retries
+        self.retry_delay = retry_delay
+
+        # Latens per operation; långsamma frågor loggas till "claims.slow_queries"
+        self.metrics = metrics or METRICS
+        self.slow_query_ms = slow_query_ms
+        self._connect_time = self.metrics.histogram("claims_operation_seconds",
+                                                    operation="connect")
+        self._commit_time = self.metrics.histogram("claims_operation_seconds",
+                                                   operation="commit")
+        self._busy_retries = self.metrics.counter("claims_busy_retries_total")
+        self._fetch_time = self.metrics.histogram("claims_operation_seconds",
+                                                  operation="fetch")
+
+        # En långlivad anslutning per tråd istället för en ny per anrop
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        # Fordonsklasserna åt båda hållen, namn -> id och id -> namn
+        self._class_ids = {}
+        self._class_names = _Lookup(self._load_class_name)
+
+        # Cache för läsmetoderna; dataversionen räknas upp vid varje commit
+        self.cache = QueryCache(query_cache_entries, query_cache_rows)
+        self._data_version = 0
+
         self.setup_database()
-    
-    def setup_database(self):
-        """Skapar databasen och tabellen om de inte finns"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS claims (
-            claim_id INTEGER PRIMARY KEY,
-            date TEXT NOT NULL,
-            vehicle_class TEXT NOT NULL,
-            claim_amount REAL NOT NULL,
-            description TEXT
-        )
-        """)
-        
-        # Försök lägga till description-kolumn om den inte finns
+
+    def _connect(self):
+        """Öppnar en ny anslutning och sätter PRAGMA-inställningarna"""
+        start = time.perf_counter()
+        # isolation_level=None: transaktioner styrs explicit via transaction()
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout, isolation_level=None,
+                               check_same_thread=False, factory=InstrumentedConnection)
+        slow_query_seconds = None if self.slow_query_ms is None else self.slow_query_ms / 1000
+        conn.instrument(self.metrics, slow_query_seconds)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA foreign_keys=ON")
+        self._connect_time.observe(time.perf_counter() - start)
+
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def get_connection(self):
+        """Returnerar trådens anslutning och öppnar den vid första anropet"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+            # Arkivfiler som är inkopplade med ATTACH, schema -> sökväg
+            self._local.attached = {}
+            self._local.data_version = None
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Kör blocket i en transaktion som committas eller rullas tillbaka
+
+        Nästlade anrop återanvänder den yttre transaktionen. Skrivlåset tas
+        direkt (BEGIN IMMEDIATE), så att en annan skrivare aldrig kan göra
+        transaktionen ogiltig halvvägs; är databasen upptagen görs nya försök.
+        """
+        conn = self.get_connection()
+        if self._local.depth > 0:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        self._begin_immediate(conn)
+        self._local.depth = 1
         try:
-            cursor.execute("ALTER TABLE claims ADD COLUMN description TEXT")
-        except sqlite3.OperationalError:
-            # Kolumnen finns redan, ignorerar felet
-            pass
-        
-        conn.commit()
-        conn.close()
-    
-    def add_claim(self, date, vehicle_class, claim_amount, description=""):
-        """Lägger till en ny skadeanmälan i databasen"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-        INSERT INTO claims (date, vehicle_class, claim_amount, description)
-        VALUES (?, ?, ?, ?)
-        """, (date, vehicle_class, claim_amount, description))
-        
-        conn.commit()
-        claim_id = cursor.lastrowid
-        conn.close()
-        
+            # Med skrivlåset taget: har någon annan ändrat databasen sedan sist
+            # måste fordonsklasserna slås upp igen innan rader kodas
+            self.data_version()
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            # Nyskapade fordonsklasser kan ha rullats tillbaka
+            self._forget_vehicle_classes()
+            raise
+        else:
+            start = time.perf_counter()
+            conn.execute("COMMIT")
+            self._commit_time.observe(time.perf_counter() - start)
+            self._invalidate_cache()
+        finally:
+            self._local.depth = 0
+
+    def _begin_immediate(self, conn):
+        delay = self.retry_delay
+        for attempt in range(self.busy_retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e):
+                    raise
+                if attempt == self.busy_retries:
+                    raise DatabaseBusyError(
+                        "Databasen används av ett annat program, försök igen om en stund") from e
+            self._busy_retries.increment()
+            # Slumpad paus så att väntande skrivare inte försöker samtidigt igen
+            time.sleep(delay * (1 + random.random()))
+            delay *= 2
+
+    def data_version(self):
+        """Räknare som ändras när databasen har ändrats
+
+        Egna skrivningar räknar upp den vid commit. Ändringar från andra
+        anslutningar och processer upptäcks via PRAGMA data_version; då töms
+        även fordonsklasserna, eftersom t.ex. reset_database i en annan
+        process delar ut samma id till andra namn.
+        """
+        conn = self.get_connection()
+        seen = conn.execute("PRAGMA data_version").fetchone()[0]
+        if seen != self._local.data_version:
+            # Första gången i en ny tråd vet vi inte vad som hänt innan
+            self._local.data_version = seen
+            self._forget_vehicle_classes()
+            self._invalidate_cache()
+        return self._data_version
+
+    def _invalidate_cache(self):
+        with self._lock:
+            self._data_version += 1
+        self.cache.clear()
+
+    def _cached(self, key, load):
+        """Läser genom cachen
+
+        Versionen hämtas före frågan. Ett resultat som läses samtidigt med en
+        skrivning sparas därför under den gamla versionen och används aldrig.
+        """
+        return self.cache.get_or_load(key, self.data_version(), load)
+
+    def close(self):
+        """Stänger alla öppna anslutningar"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            # Låt SQLite uppdatera statistiken som frågeplaneraren använder. Det
+            # är bara en optimering; skriver en annan process just nu hoppas den över
+            try:
+                conn.execute("PRAGMA optimize")
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e):
+                    raise
+            conn.close()
+        self._local = threading.local()
+
+    def setup_database(self):
+        """Skapar eller uppgraderar databasschemat till senaste versionen"""
+        migrations.upgrade(self)
+
+    def archive_claims(self, before):
+        """Flyttar anmälningar daterade före before (YYYY-MM-DD) till arkivfiler per år
+
+        Läsmetoderna läser därefter både claims och de arkiv som berörs, så
+        resultaten blir desamma; statistiken påverkas inte. Returnerar antalet
+        flyttade anmälningar.
+        """
+        return archive.archive_claims(self, date_to_day(before))
+
+    def _archives(self, day_from=None, day_to=None):
+        """Arkiven som överlappar [day_from, day_to]
+
+        Varje arkiv är (schema, sökväg, run, första dag, sista dag).
+        """
+        archives = self._cached(("archives",), self._load_archives)
+        return [entry for entry in archives
+                if (day_from is None or entry[4] >= day_from)
+                and (day_to is None or entry[3] <= day_to)]
+
+    def _load_archives(self):
+        archives = []
+        for year, path, run in self.get_connection().execute(
+                "SELECT year, path, run FROM claim_archives ORDER BY year DESC"):
+            archives.append((archive.archive_schema(year), path, run) + archive.year_days(year))
+        return archives
+
+    def _attach_archives(self, conn, archives):
+        """Kopplar in arkiven (schema, sökväg, ...) med ATTACH på trådens anslutning
+
+        Inkopplingarna ligger kvar till nästa gång. Arkiv som inte behövs
+        kopplas loss när SQLite:s gräns för antalet inkopplade filer nås.
+        """
+        attached = self._local.attached
+        wanted = {entry[0]: entry[1] for entry in archives}
+        missing = [schema for schema, path in wanted.items() if attached.get(schema) != path]
+        if not missing:
+            return
+        room = _attach_limit(conn) - len(attached)
+        for schema, path in list(attached.items()):
+            if wanted.get(schema, path) != path or (schema not in wanted and room < len(missing)):
+                conn.execute(f"DETACH DATABASE {schema}")
+                del attached[schema]
+                room += 1
+        for schema in missing:
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (wanted[schema],))
+            attached[schema] = wanted[schema]
+
+    def _detach_archives(self, conn):
+        for schema in list(self._local.attached):
+            conn.execute(f"DETACH DATABASE {schema}")
+        self._local.attached.clear()
+
+    def _partition_queries(self, archives, conditions, params, order=None, limit=None,
+                           search=False):
+        """SQL för claims och för arkiven, som [(arkiv, sql, parametrar)]
+
+        Första frågan läser claims. Arkiven läses med UNION ALL i så stora
+        grupper som ATTACH tillåter, och varje del begränsas till limit rader.
+        I arkiven räknas bara rader från avslutade arkiveringar.
+        """
+        tail = ""
+        tail_params = []
+        if order is not None:
+            tail += f" ORDER BY {order}"
+        if limit is not None:
+            tail += " LIMIT ?"
+            tail_params.append(limit)
+
+        def select(schema, run):
+            where = list(conditions)
+            if schema is None:
+                prefix = ""
+            else:
+                prefix = schema + "."
+                where.append(f"c.archive_run <= {int(run)}")
+            if search:
+                sql = f"""
+                SELECT {CLAIM_COLUMNS}, bm25(claims_fts) AS rank
+                FROM {prefix}claims_fts JOIN {prefix}claims AS c ON c.claim_id = claims_fts.rowid
+                """
+            else:
+                sql = f"SELECT {CLAIM_COLUMNS} FROM {prefix}claims AS c"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            return sql + tail
+
+        queries = [((), select(None, None), list(params) + tail_params)]
+        size = _attach_limit(self.get_connection())
+        for start in range(0, len(archives), size):
+            group = archives[start:start + size]
+            sql = " UNION ALL ".join(f"SELECT * FROM ({select(entry[0], entry[2])})"
+                                     for entry in group)
+            group_params = (list(params) + tail_params) * len(group)
+            if len(group) > 1:
+                # Sorteringen för hela UNION ALL går på resultatkolumnernas namn
+                sql += tail.replace("c.", "")
+                group_params += tail_params
+            queries.append((group, sql, group_params))
+        return queries
+
+    def _read_claims(self, conditions=(), params=(), order=None, limit=None,
+                     day_from=None, day_to=None, search=False):
+        """Läser rader ur claims och ur de arkiv som överlappar [day_from, day_to]
+
+        Utan arkiv returneras markören för frågan mot claims direkt. Annars
+        läses claims först: har den redan limit rader i en datumsortering
+        behövs bara arkiven som kan ha rader före den sista. Raderna från
+        partitionerna slås sedan ihop i sorteringsordningen.
+        """
+        conn = self.get_connection()
+        archives = self._archives(day_from, day_to)
+        queries = self._partition_queries(archives, conditions, params, order, limit, search)
+        rows = conn.execute(*queries[0][1:])
+        if not archives:
+            return rows
+
+        rows = rows.fetchall()
+        if limit is not None and len(rows) == limit and order.startswith("c.day"):
+            boundary = rows[-1][1]
+            if order.endswith("DESC"):
+                archives = [entry for entry in archives if entry[4] >= boundary]
+            else:
+                archives = [entry for entry in archives if entry[3] <= boundary]
+            if not archives:
+                return rows
+            queries = self._partition_queries(archives, conditions, params, order, limit, search)
+
+        results = [rows]
+        for group, sql, group_params in queries[1:]:
+            self._attach_archives(conn, group)
+            results.append(conn.execute(sql, group_params).fetchall())
+        key, reverse = MERGE_KEYS[order]
+        return list(islice(heapq.merge(*results, key=key, reverse=reverse), limit))
+
+    def _vehicle_class_id(self, conn, name, create=False):
+        """Slår upp (och skapar vid behov) id för en fordonsklass"""
+        class_id = self._class_ids.get(name)
+        if class_id is not None:
+            return class_id
+
+        row = conn.execute("SELECT vehicle_class_id FROM vehicle_classes WHERE name = ?",
+                           (name,)).fetchone()
+        if row is None:
+            if not create:
+                return None
+            cursor = conn.execute("INSERT INTO vehicle_classes (name) VALUES (?)", (name,))
+            class_id = cursor.lastrowid
+        else:
+            class_id = row[0]
+        self._class_ids[name] = class_id
+        return class_id
+
+    def _load_class_name(self, class_id):
+        row = self.get_connection().execute(
+            "SELECT name FROM vehicle_classes WHERE vehicle_class_id = ?", (class_id,)).fetchone()
+        if row is None:
+            raise KeyError(class_id)
+        return row[0]
+
+    def _forget_vehicle_classes(self):
+        self._class_ids.clear()
+        self._class_names.clear()
+
+    def _decode_rows(self, rows):
+        """Avkodar rader från lagringsformatet till samma form som tabellen hade förut"""
+        # Läsningen har redan börjat, så klassnamnen hämtas från samma version
+        self.data_version()
+        dates = _DATE_STRINGS
+        names = self._class_names
+        start = time.perf_counter()
+        decoded = [(claim_id, dates[day], names[class_id], ore / 100, description)
+                   for claim_id, day, class_id, ore, description in rows]
+        self._fetch_time.observe(time.perf_counter() - start)
+        return decoded
+
+    def _encode_claims(self, conn, claims):
+        """Gör om (date, vehicle_class, claim_amount, description, idempotency_key)
+        till lagringsformatet; de två sista är valfria
+
+        Returnerar (rader att skriva, samma anmälningar avrundade till hela öre
+        för statistiken). En rad med idempotency_key får ingen content_hash,
+        se dedup.py.
+        """
+        rows = []
+        rounded = []
+        for claim in claims:
+            date, vehicle_class, amount = claim[0], claim[1], claim[2]
+            description = claim[3] if len(claim) > 3 else ""
+            key = claim[4] if len(claim) > 4 else None
+            day = date_to_day(date)
+            ore = amount_to_ore(amount)
+            class_id = self._vehicle_class_id(conn, vehicle_class, True)
+            content_hash = None
+            if key is None:
+                content_hash = dedup.content_hash(day, class_id, ore, description)
+            rows.append((day, class_id, ore, description, content_hash, key))
+            # Statistiken grupperar på date[:7], så datum som 2024-1-5 skrivs om
+            if len(date) != 10:
+                date = day_to_date(day)
+            rounded.append((date, vehicle_class, ore / 100))
+        return rows, rounded
+
+    def add_claim(self, date, vehicle_class, claim_amount, description="", idempotency_key=None,
+                  return_inserted=False):
+        """Lägger till en ny skadeanmälan i databasen
+
+        Finns anmälan redan (samma innehåll, eller samma idempotency_key) lagras
+        den inte igen, och den befintliga anmälans claim_id returneras. Med
+        return_inserted=True returneras (claim_id, inserted), där inserted är
+        False för en anmälan som redan var registrerad.
+        """
+        with self.transaction() as conn:
+            rows, rounded = self._encode_claims(
+                conn, [(date, vehicle_class, claim_amount, description, idempotency_key)])
+            claim_id, inserted = self._insert_claim(conn, rows[0], self._has_archived_keys(conn),
+                                                    self._first_free_claim_id(conn))
+            if inserted:
+                ClaimStatistics.record_claims(conn, rounded)
+
+        if return_inserted:
+            return claim_id, inserted
         return claim_id
-    
+
+    def add_claims_bulk(self, claims, batch_size=5000, return_ids=False):
+        """Lägger till många skadeanmälningar i en och samma transaktion
+
+        claims är en iterabel av (date, vehicle_class, claim_amount, description)
+        eller (..., description, idempotency_key) och läses i omgångar om
+        batch_size rader. Dubbletter hoppas över. Returnerar antal nya rader,
+        eller med return_ids=True listan med claim_id i samma ordning som
+        claims, där en dubblett får den befintliga anmälans claim_id.
+        """
+        if return_ids:
+            return self._add_claims_returning_ids(claims)
+
+        count = 0
+        with self.transaction() as conn:
+            batch = []
+            for claim in claims:
+                batch.append(claim)
+                if len(batch) >= batch_size:
+                    count += self._insert_batch(conn, batch)
+                    batch = []
+            if batch:
+                count += self._insert_batch(conn, batch)
+
+        return count
+
+    def _add_claims_returning_ids(self, claims):
+        """Som add_claims_bulk men rad för rad, för att få varje rads claim_id"""
+        claim_ids = []
+        with self.transaction() as conn:
+            rows, rounded = self._encode_claims(conn, claims)
+            check_archive = self._has_archived_keys(conn)
+            inserted = []
+            with self._search_index_paused(conn) as last_id:
+                first_id = self._first_free_claim_id(conn, last_id)
+                for row, claim in zip(rows, rounded):
+                    claim_id, is_new = self._insert_claim(conn, row, check_archive, first_id)
+                    claim_ids.append(claim_id)
+                    if is_new:
+                        inserted.append(claim)
+                        # Därefter väljer SQLite själv ett id som aldrig använts
+                        first_id = None
+            ClaimStatistics.record_claims(conn, inserted)
+
+        return claim_ids
+
+    def _insert_batch(self, conn, batch):
+        """Skriver en omgång rader med executemany; dubbletter hoppas över"""
+        rows, rounded = self._encode_claims(conn, batch)
+        if self._has_archived_keys(conn):
+            archived = self._existing_claim_ids(conn, "claim_archive_keys",
+                                                [row[4:] for row in rows])
+            rows = [row for row, claim_id in zip(rows, archived) if claim_id is None]
+            rounded = [claim for claim, claim_id in zip(rounded, archived) if claim_id is None]
+        with self._search_index_paused(conn) as last_id:
+            first_id = self._first_free_claim_id(conn, last_id)
+            if first_id is None:
+                cursor = conn.executemany(INSERT_CLAIM, rows)
+            else:
+                cursor = conn.executemany(
+                    INSERT_CLAIM_WITH_ID, [(first_id + i,) + row for i, row in enumerate(rows)])
+        if cursor.rowcount < len(rows):
+            rounded = self._inserted_claims(conn, rows, rounded, last_id)
+        ClaimStatistics.record_claims(conn, rounded)
+        return len(rounded)
+
+    def _insert_claim(self, conn, row, check_archive, claim_id=None):
+        """Skriver en rad; returnerar (claim_id, True) eller (befintligt claim_id, False)"""
+        keys = [row[4:]]
+        if check_archive:
+            existing = self._existing_claim_ids(conn, "claim_archive_keys", keys)[0]
+            if existing is not None:
+                return existing, False
+        if claim_id is None:
+            cursor = conn.execute(INSERT_CLAIM, row)
+        else:
+            cursor = conn.execute(INSERT_CLAIM_WITH_ID, (claim_id,) + row)
+        if cursor.rowcount:
+            return cursor.lastrowid, True
+        return self._existing_claim_ids(conn, "claims", keys)[0], False
+
+    def _first_free_claim_id(self, conn, last_id=None):
+        """claim_id för nästa nya rad, eller None när SQLite kan välja själv
+
+        SQLite delar ut max(claim_id) + 1. Har raden med högst claim_id
+        arkiverats eller tagits bort som dubblett skulle dess id delas ut igen;
+        då numreras nya rader från claim_id_sequence, det högsta id som
+        någonsin funnits i claims.
+        """
+        if last_id is None:
+            highest, last_id = conn.execute("""
+            SELECT last_claim_id, (SELECT coalesce(max(claim_id), 0) FROM claims)
+            FROM claim_id_sequence
+            """).fetchone()
+        else:
+            highest = conn.execute("SELECT last_claim_id FROM claim_id_sequence").fetchone()[0]
+        return highest + 1 if highest > last_id else None
+
+    def _inserted_claims(self, conn, rows, rounded, last_id):
+        """De anmälningar i rounded vars rad faktiskt skrevs, när några var dubbletter
+
+        De unika indexen gör att varje (content_hash, idempotency_key) finns
+        högst en gång bland de nya raderna.
+        """
+        new_keys = set(conn.execute(
+            "SELECT content_hash, idempotency_key FROM claims WHERE claim_id > ?", (last_id,)))
+        inserted = []
+        for row, claim in zip(rows, rounded):
+            if row[4:] in new_keys:
+                new_keys.discard(row[4:])
+                inserted.append(claim)
+        return inserted
+
+    def _has_archived_keys(self, conn):
+        return conn.execute("SELECT EXISTS (SELECT 1 FROM claim_archive_keys)").fetchone()[0]
+
+    def _existing_claim_ids(self, conn, table, keys):
+        """claim_id i table för varje (content_hash, idempotency_key), None om den saknas
+
+        En rad med idempotency_key slås upp på nyckeln, annars på content_hash.
+        """
+        found = {}
+        for index, column in enumerate(("content_hash", "idempotency_key")):
+            values = list({key[index] for key in keys if key[index] is not None})
+            for start in range(0, len(values), 500):
+                chunk = values[start:start + 500]
+                found.update(((index, value), claim_id) for value, claim_id in conn.execute(f"""
+                SELECT {column}, claim_id FROM {table}
+                WHERE {column} IN ({", ".join("?" * len(chunk))})
+                """, chunk))
+        return [found.get((1, key[1]) if key[1] is not None else (0, key[0])) for key in keys]
+
+    def find_duplicates(self, remove=False, batch_size=50000):
+        """Letar upp dubbletter bland äldre anmälningar, se dedup.find_duplicates"""
+        return dedup.find_duplicates(self, remove, batch_size)
+
+    @contextmanager
+    def _search_index_paused(self, conn):
+        """Indexerar nya rader i sökindexet med en sats istället för en per rad
+
+        Via triggern tömmer FTS5 sin buffert för varje rad, vilket gör
+        bulkinläsning flera gånger långsammare. Markeringsraden i
+        claims_fts_paused syns aldrig utanför den egna transaktionen.
+        """
+        last_id = conn.execute("SELECT max(claim_id) FROM claims").fetchone()[0] or 0
+        conn.execute("INSERT INTO claims_fts_paused DEFAULT VALUES")
+        try:
+            yield last_id
+            conn.execute("""
+            INSERT INTO claims_fts (rowid, description)
+            SELECT claim_id, description FROM claims WHERE claim_id > ?
+            """, (last_id,))
+        finally:
+            conn.execute("DELETE FROM claims_fts_paused")
+
     def get_all_claims(self):
         """Hämtar alla skadeanmälningar sorterade på datum"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM claims ORDER BY date DESC")
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return rows
-    
+        return self._cached(("all",), lambda: self._decode_rows(
+            self._read_claims(order="c.day DESC")))
+
+    def get_claims_page(self, limit=200, after=None, before=None):
+        """Hämtar en sida skadeanmälningar med keyset-paginering
+
+        Sidorna är sorterade på (date, claim_id) i fallande ordning. after och
+        before är nyckeln (date, claim_id) för sista respektive första raden
+        på den sida man redan har; utan nyckel hämtas första sidan.
+        """
+        return self._cached(("page", limit, after, before),
+                            lambda: self._load_claims_page(limit, after, before))
+
+    def _load_claims_page(self, limit, after, before):
+        if before is not None:
+            # Bläddra bakåt: hämta i stigande ordning och vänd på resultatet
+            day = date_to_day(before[0])
+            rows = self._decode_rows(self._read_claims(
+                ["(c.day, c.claim_id) > (?, ?)"], [day, before[1]],
+                "c.day ASC, c.claim_id ASC", limit, day_from=day))
+            rows.reverse()
+            return rows
+
+        if after is not None:
+            day = date_to_day(after[0])
+            return self._decode_rows(self._read_claims(
+                ["(c.day, c.claim_id) < (?, ?)"], [day, after[1]],
+                "c.day DESC, c.claim_id DESC", limit, day_to=day))
+
+        return self._decode_rows(self._read_claims(order="c.day DESC, c.claim_id DESC",
+                                                   limit=limit))
+
+    def query_claims(self, vehicle_class=None, date_from=None, date_to=None,
+                     min_amount=None, limit=None, order="date_desc", after=None):
+        """Hämtar skadeanmälningar filtrerade på fordonsklass, datumintervall och belopp
+
+        Datumgränserna är inklusiva (YYYY-MM-DD). Filtren på fordonsklass och
+        datum använder indexen så att tabellen aldrig behöver läsas i sin helhet,
+        och arkiv utanför datumintervallet läses inte alls.
+        after är nyckeln (date, claim_id) för sista raden på föregående sida.
+        """
+        query = self._build_claims_query(vehicle_class, date_from, date_to,
+                                         min_amount, limit, order, after)
+        key = (query["conditions"], tuple(query["params"]), query["order"], limit,
+               query["day_from"], query["day_to"])
+        return self._cached(key, lambda: self._decode_rows(self._read_claims(**query)))
+
+    def explain_query_claims(self, **filters):
+        """Returnerar SQLite:s frågeplan (EXPLAIN QUERY PLAN) för query_claims
+
+        Med arkiv kommer planen för claims först, följd av planerna för arkiven.
+        """
+        query = self._build_claims_query(**filters)
+        conn = self.get_connection()
+        archives = self._archives(query.pop("day_from"), query.pop("day_to"))
+        plan = []
+        for group, sql, params in self._partition_queries(archives, **query):
+            self._attach_archives(conn, group)
+            plan.extend(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        return plan
+
+    def _build_claims_query(self, vehicle_class=None, date_from=None, date_to=None,
+                            min_amount=None, limit=None, order="date_desc", after=None):
+        """Bygger villkor och parametrar för query_claims (argument till _read_claims)"""
+        if order not in QUERY_ORDERS:
+            raise ValueError(f"Okänd sortering: {order}")
+
+        conditions = []
+        params = []
+        day_from = day_to = None
+        if vehicle_class is not None:
+            # data_version() glömmer klass-id som en annan anslutning kan ha
+            # delat ut på nytt. Okänd klass ger id NULL och därmed inga träffar
+            self.data_version()
+            conditions.append("c.vehicle_class_id = ?")
+            params.append(self._vehicle_class_id(self.get_connection(), vehicle_class))
+        if date_from is not None:
+            day_from = date_to_day(date_from)
+            conditions.append("c.day >= ?")
+            params.append(day_from)
+        if date_to is not None:
+            day_to = date_to_day(date_to)
+            conditions.append("c.day <= ?")
+            params.append(day_to)
+        if min_amount is not None:
+            conditions.append("c.amount_ore >= ?")
+            params.append(float(min_amount) * 100)
+        if after is not None:
+            operator = "<" if order == "date_desc" else ">"
+            conditions.append(f"(c.day, c.claim_id) {operator} (?, ?)")
+            day = date_to_day(after[0])
+            params.extend((day, after[1]))
+            # Nyckeln begränsar också vilka arkiv som kan ha fler rader
+            if order == "date_desc":
+                day_to = day if day_to is None else min(day_to, day)
+            else:
+                day_from = day if day_from is None else max(day_from, day)
+
+        return {"conditions": tuple(conditions), "params": params,
+                "order": QUERY_ORDERS[order], "limit": limit,
+                "day_from": day_from, "day_to": day_to}
+
+    def search_claims(self, text, vehicle_class=None, date_from=None, date_to=None, limit=100):
+        """Fritextsökning i beskrivningarna, bästa träff (bm25) först
+
+        Varje ord i text måste finnas i beskrivningen; orden matchas som
+        prefix så att en halvskriven sökning ger träffar. Övriga filter
+        fungerar som i query_claims.
+        """
+        words = re.findall(r"\w+", text)
+        if not words:
+            return []
+
+        conditions = ["claims_fts MATCH ?"]
+        params = [" ".join(f'"{word}"*' for word in words)]
+        day_from = day_to = None
+        if vehicle_class is not None:
+            self.data_version()
+            conditions.append("c.vehicle_class_id = ?")
+            params.append(self._vehicle_class_id(self.get_connection(), vehicle_class))
+        if date_from is not None:
+            day_from = date_to_day(date_from)
+            conditions.append("c.day >= ?")
+            params.append(day_from)
+        if date_to is not None:
+            day_to = date_to_day(date_to)
+            conditions.append("c.day <= ?")
+            params.append(day_to)
+
+        def load():
+            rows = self._read_claims(conditions, params, "rank", limit, day_from, day_to,
+                                     search=True)
+            # Sista kolumnen är bm25-rangen, som bara behövs för sorteringen
+            return self._decode_rows(row[:5] for row in rows)
+
+        return self._cached(("search", tuple(conditions), tuple(params), limit), load)
+
+    def iter_claims(self, chunksize=50000, after_claim_id=0):
+        """Läser claims-tabellen i omgångar sorterade på claim_id
+
+        Varje omgång hämtas med keyset på claim_id, så att minnet begränsas
+        av chunksize och ingen läsning hålls öppen mellan omgångarna.
+        """
+        for rows in self.iter_raw_claims(chunksize, after_claim_id):
+            yield self._decode_rows(rows)
+
+    def iter_raw_claims(self, chunksize=50000, after_claim_id=0):
+        """Som iter_claims men i lagringsformatet
+
+        Raderna är (claim_id, day, vehicle_class_id, amount_ore, description),
+        utan avkodning av datum, klass eller belopp.
+        """
+        last_id = after_claim_id
+        while True:
+            cursor = self._read_claims(["c.claim_id > ?"], [last_id], "c.claim_id", chunksize)
+            start = time.perf_counter()
+            rows = list(cursor)
+            self._fetch_time.observe(time.perf_counter() - start)
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def get_generation(self):
+        """Ändras när anmälningar har tagits bort, se migrations.new_generation"""
+        return self.get_connection().execute(
+            "SELECT generation FROM claims_generation").fetchone()[0]
+
+    def get_vehicle_classes(self):
+        """Returnerar {vehicle_class_id: namn} för alla kända fordonsklasser"""
+        return dict(self.get_connection().execute(
+            "SELECT vehicle_class_id, name FROM vehicle_classes"))
+
+    def iter_dataframes(self, chunksize=50000):
+        """Läser claims-tabellen som Pandas-DataFrames om högst chunksize rader
+
+        Kolumnerna är typade: date som datetime64, vehicle_class som kategori
+        (samma kategorier i alla omgångar) och claim_amount som float64.
+        """
+        if pd is None:
+            raise ImportError("DataFrame-export kräver paketet pandas (pip install pandas)")
+
+        # Kategorierna är klasstabellen; klass-id:na översätts direkt till koder
+        classes = sorted(self.get_vehicle_classes().items(), key=lambda item: item[1])
+        categories = [name for _, name in classes]
+        codes = {class_id: code for code, (class_id, _) in enumerate(classes)}
+
+        for rows in self.iter_raw_claims(chunksize):
+            claim_ids, days, class_ids, amounts, descriptions = zip(*rows)
+            yield pd.DataFrame({
+                "claim_id": pd.array(claim_ids, dtype="int64"),
+                "date": pd.to_datetime(pd.array(days, dtype="int64"), unit="D"),
+                "vehicle_class": pd.Categorical.from_codes(
+                    [codes[class_id] for class_id in class_ids], categories),
+                "claim_amount": pd.array(amounts, dtype="int64") / 100,
+                "description": pd.array(descriptions, dtype="object"),
+            })
+
+    def to_dataframe(self, chunksize=50000):
+        """Läser hela claims-tabellen till en DataFrame, en omgång i taget"""
+        frames = list(self.iter_dataframes(chunksize))
+        if not frames:
+            return pd.DataFrame({
+                "claim_id": pd.array([], dtype="int64"),
+                "date": pd.to_datetime([]),
+                "vehicle_class": pd.Categorical([]),
+                "claim_amount": pd.array([], dtype="float64"),
+                "description": pd.array([], dtype="object"),
+            })
+        return pd.concat(frames, ignore_index=True)
+
+    def get_class_statistics(self):
+        """Hämtar statistik per fordonsklass ur sammanfattningstabellen"""
+        return self._cached(("class_stats",), lambda: ClaimStatistics.get_class_statistics(
+            self.get_connection()))
+
+    def get_monthly_statistics(self, vehicle_class=None):
+        """Hämtar statistik per fordonsklass och månad"""
+        return self._cached(("monthly_stats", vehicle_class),
+                            lambda: ClaimStatistics.get_monthly_statistics(
+                                self.get_connection(), vehicle_class))
+
     def clear_database(self):
-        """Rensar alla skadeanmälningar från databasen"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM claims")
-        conn.commit()
-        conn.close()
-    
+        """Rensar alla skadeanmälningar från databasen
+
+        claims skapas om istället för att tömmas rad för rad, och arkivfilerna
+        tas bort i sin helhet.
+        """
+        conn = self.get_connection()
+        self._detach_archives(conn)
+        with self.transaction() as conn:
+            paths = [row[0] for row in conn.execute("SELECT path FROM claim_archives")]
+            conn.execute("DELETE FROM claim_archives")
+            conn.execute("DELETE FROM claim_archive_keys")
+            # Numreringen börjar om från 1, som när tabellen var tom från början
+            conn.execute("UPDATE claim_id_sequence SET last_claim_id = 0")
+            migrations.recreate_claims_table(conn)
+            migrations.new_generation(conn)
+            ClaimStatistics.clear(conn)
+        archive.remove_archive_files(paths)
+
     def reset_database(self):
-        """Återställer hela databasen (raderar och skapar ny tabell)"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute("DROP TABLE IF EXISTS claims")
-        cursor.execute("""
-        CREATE TABLE claims (
-            claim_id INTEGER PRIMARY KEY,
-            date TEXT NOT NULL,
-            vehicle_class TEXT NOT NULL,
-            claim_amount REAL NOT NULL,
-            description TEXT
-        )
-        """)
-        
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        """Återställer hela databasen (raderar och skapar nya tabeller)"""
+        conn = self.get_connection()
+        self._detach_archives(conn)
+        with self.transaction() as conn:
+            paths = []
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'claim_archives'").fetchone():
+                paths = [row[0] for row in conn.execute("SELECT path FROM claim_archives")]
+            conn.execute("DROP TABLE IF EXISTS claim_archives")
+            conn.execute("DROP TABLE IF EXISTS claim_archive_keys")
+            conn.execute("DROP TABLE IF EXISTS claim_id_sequence")
+            conn.execute("DROP TABLE IF EXISTS claims_fts")
+            conn.execute("DROP TABLE IF EXISTS claims_fts_paused")
+            conn.execute("DROP TABLE IF EXISTS claims")
+            conn.execute("DROP TABLE IF EXISTS vehicle_classes")
+            ClaimStatistics.drop_tables(conn)
+            self._forget_vehicle_classes()
+            conn.execute("PRAGMA user_version = 0")
+            migrations.upgrade(self)
+            migrations.new_generation(conn)
+        archive.remove_archive_files(paths)
@@ -0,0 +1,86 @@
+"""Dubblettkontroll för skadeanmälningar
+
+Varje anmälan får en content_hash, ett 64-bitars hashvärde av dag,
+fordonsklass, belopp och beskrivning, som har ett unikt index i claims. En
+anmälan som lämnas in igen (dubbelklick, en import som körs om) hittas därför
+med en indexuppslagning och lagras inte en gång till. Lämnar klienten en
+idempotency_key avgör nyckeln istället: samma nyckel ger samma anmälan, och
+två anmälningar med olika nycklar får ha samma innehåll.
+
+Anmälningar som lagrades före dubblettkontrollen saknar content_hash tills
+find_duplicates har gått igenom dem.
+"""
+import hashlib
+import struct
+
+import migrations
+from claim_statistics import ClaimStatistics
+
+_pack_numbers = struct.Struct("<iiq").pack
+
+
+def content_hash(day, vehicle_class_id, amount_ore, description):
+    """Hashvärde av en anmälans innehåll, som ett signerat 64-bitars heltal"""
+    data = _pack_numbers(day, vehicle_class_id, amount_ore) + (description or "").encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True)
+
+
+def find_duplicates(db_manager, remove=False, batch_size=50000):
+    """Letar upp dubbletter bland anmälningar som saknar content_hash
+
+    Raderna gås igenom i claim_id-ordning, i omgångar om batch_size som
+    committas var för sig. Varje rads hashvärde slås upp i indexen istället
+    för att jämföras med alla andra rader: finns det redan är raden en
+    dubblett, annars får raden hashvärdet. Med remove=True tas dubbletterna
+    bort och räknas bort ur statistiken; annars ligger de kvar och hittas
+    igen nästa gång. Returnerar [(dubblettens claim_id, originalets claim_id)].
+    """
+    duplicates = []
+    last_id = 0
+    while True:
+        with db_manager.transaction() as conn:
+            rows = conn.execute("""
+            SELECT claim_id, day, vehicle_class_id, amount_ore, description FROM claims
+            WHERE claim_id > ? AND content_hash IS NULL AND idempotency_key IS NULL
+            ORDER BY claim_id
+            LIMIT ?
+            """, (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            keys = [(content_hash(*row[1:]), None) for row in rows]
+            in_claims = db_manager._existing_claim_ids(conn, "claims", keys)
+            in_archive = db_manager._existing_claim_ids(conn, "claim_archive_keys", keys)
+
+            found = []
+            hashed = []
+            seen = {}
+            for row, (value, _), original, archived in zip(rows, keys, in_claims, in_archive):
+                original = original or archived or seen.get(value)
+                if original is None:
+                    seen[value] = row[0]
+                    hashed.append((value, row[0]))
+                else:
+                    found.append((row, original))
+
+            conn.executemany("UPDATE claims SET content_hash = ? WHERE claim_id = ?", hashed)
+            if remove and found:
+                _remove_claims(db_manager, conn, [row for row, _ in found])
+            duplicates.extend((row[0], original) for row, original in found)
+
+    return duplicates
+
+
+def _remove_claims(db_manager, conn, rows):
+    # Sökindexet uppdateras med en sats per rad istället för via triggern
+    conn.execute("INSERT INTO claims_fts_paused DEFAULT VALUES")
+    conn.executemany("""
+    INSERT INTO claims_fts (claims_fts, rowid, description) VALUES ('delete', ?, ?)
+    """, [(row[0], row[4]) for row in rows])
+    migrations.record_last_claim_id(conn)
+    conn.executemany("DELETE FROM claims WHERE claim_id = ?", [(row[0],) for row in rows])
+    conn.execute("DELETE FROM claims_fts_paused")
+    migrations.new_generation(conn)
+    ClaimStatistics.remove_duplicates(
+        conn, [claim[1:4] for claim in db_manager._decode_rows(rows)])
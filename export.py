@@ -0,0 +1,178 @@
+"""Export av claims-tabellen till kolumnformat (Parquet och Feather) och
+rapporter (CSV och Excel)
+
+Tabellen strömmas omgång för omgång via DatabaseManager.iter_dataframes eller
+iter_claims, så minnesåtgången begränsas av chunksize oavsett tabellens storlek.
+"""
+import csv
+import gzip
+from datetime import date
+
+CLAIM_COLUMNS = ["claim_id", "date", "vehicle_class", "claim_amount", "description"]
+STATISTICS_COLUMNS = ["vehicle_class", "count", "sum", "mean", "min", "max", "variance"]
+
+# Rubriker i Excel-rapporten
+CLAIM_HEADINGS = ["ID", "Datum", "Fordonsklass", "Belopp (SEK)", "Beskrivning"]
+STATISTICS_HEADINGS = ["Fordonsklass", "Antal", "Summa (SEK)", "Medel (SEK)",
+                       "Min (SEK)", "Max (SEK)", "Varians"]
+MONTHLY_HEADINGS = STATISTICS_HEADINGS[:1] + ["Månad"] + STATISTICS_HEADINGS[1:]
+
+# Ett Excel-blad rymmer 1 048 576 rader inklusive rubrikraden
+MAX_SHEET_ROWS = 2**20 - 1
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("Parquet/Feather-export kräver paketet pyarrow (pip install pyarrow)")
+    return pa
+
+
+def export_parquet(db_manager, path, chunksize=100000, compression="snappy"):
+    """Skriver claims-tabellen till en Parquet-fil, en radgrupp per omgång"""
+    pa = _import_pyarrow()
+    import pyarrow.parquet as pq
+
+    writer = None
+    rows = 0
+    try:
+        for frame in db_manager.iter_dataframes(chunksize):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression=compression)
+            writer.write_table(table)
+            rows += len(frame)
+        if writer is None:
+            # Tom tabell: skriv ändå en fil med rätt schema
+            table = pa.Table.from_pandas(db_manager.to_dataframe(), preserve_index=False)
+            pq.write_table(table, path, compression=compression)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows
+
+
+def export_feather(db_manager, path, chunksize=100000, compression="lz4"):
+    """Skriver claims-tabellen till en Feather-fil (Arrow IPC), en batch per omgång"""
+    pa = _import_pyarrow()
+    import pyarrow.ipc as ipc
+
+    options = ipc.IpcWriteOptions(compression=compression)
+    writer = None
+    sink = None
+    rows = 0
+    try:
+        for frame in db_manager.iter_dataframes(chunksize):
+            batch = pa.RecordBatch.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                sink = pa.OSFile(path, "wb")
+                writer = ipc.new_file(sink, batch.schema, options=options)
+            writer.write_batch(batch)
+            rows += len(frame)
+        if writer is None:
+            table = pa.Table.from_pandas(db_manager.to_dataframe(), preserve_index=False)
+            sink = pa.OSFile(path, "wb")
+            writer = ipc.new_file(sink, table.schema, options=options)
+    finally:
+        if writer is not None:
+            writer.close()
+        if sink is not None:
+            sink.close()
+
+    return rows
+
+
+def _open_text(path, compression):
+    if compression is None:
+        return open(path, "w", encoding="utf-8", newline="")
+    if compression == "gzip":
+        # Låg nivå: komprimeringen ska inte bli flaskhalsen i exporten
+        return gzip.open(path, "wt", compresslevel=6, encoding="utf-8", newline="")
+    raise ValueError(f"Okänd komprimering: {compression}")
+
+
+def export_csv(db_manager, path, chunksize=100000, compression=None):
+    """Skriver claims-tabellen till en CSV-fil, en omgång i taget
+
+    compression="gzip" skriver en gzip-komprimerad fil (t.ex. claims.csv.gz).
+    """
+    rows = 0
+    with _open_text(path, compression) as f:
+        writer = csv.writer(f)
+        writer.writerow(CLAIM_COLUMNS)
+        for chunk in db_manager.iter_claims(chunksize):
+            writer.writerows(chunk)
+            rows += len(chunk)
+    return rows
+
+
+def export_statistics_csv(db_manager, path, monthly=False, compression=None):
+    """Skriver statistiken per fordonsklass (eller per klass och månad) till CSV"""
+    columns = STATISTICS_COLUMNS
+    if monthly:
+        statistics = db_manager.get_monthly_statistics()
+        columns = columns[:1] + ["month"] + columns[1:]
+    else:
+        statistics = db_manager.get_class_statistics()
+
+    with _open_text(path, compression) as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows([row[column] for column in columns] for row in statistics)
+    return len(statistics)
+
+
+def _import_openpyxl():
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("Excel-export kräver paketet openpyxl (pip install openpyxl)")
+    return openpyxl
+
+
+def export_xlsx(db_manager, path, chunksize=100000, monthly=True):
+    """Skriver en Excel-rapport: statistik per fordonsklass och alla anmälningar
+
+    Arbetsboken skrivs i write_only-läge, där varje rad går direkt till fil,
+    så minnet inte växer med tabellen. Anmälningarna fördelas över flera blad
+    om de inte ryms på ett. Med paketet lxml installerat skriver openpyxl
+    raderna flera gånger snabbare.
+    """
+    openpyxl = _import_openpyxl()
+    workbook = openpyxl.Workbook(write_only=True)
+
+    sheet = workbook.create_sheet("Statistik")
+    sheet.append(STATISTICS_HEADINGS)
+    for row in db_manager.get_class_statistics():
+        sheet.append([row[column] for column in STATISTICS_COLUMNS])
+
+    if monthly:
+        sheet = workbook.create_sheet("Per månad")
+        sheet.append(MONTHLY_HEADINGS)
+        columns = STATISTICS_COLUMNS[:1] + ["month"] + STATISTICS_COLUMNS[1:]
+        for row in db_manager.get_monthly_statistics():
+            sheet.append([row[column] for column in columns])
+
+    # Datumen skrivs som riktiga Excel-datum; samma datum återkommer ofta
+    dates = {}
+    rows = 0
+    sheet = None
+    for chunk in db_manager.iter_claims(chunksize):
+        for claim_id, claim_date, vehicle_class, amount, description in chunk:
+            if rows % MAX_SHEET_ROWS == 0:
+                number = rows // MAX_SHEET_ROWS + 1
+                sheet = workbook.create_sheet(
+                    "Anmälningar" if number == 1 else f"Anmälningar {number}")
+                sheet.append(CLAIM_HEADINGS)
+            day = dates.get(claim_date)
+            if day is None:
+                day = dates[claim_date] = date.fromisoformat(claim_date)
+            sheet.append((claim_id, day, vehicle_class, amount, description))
+            rows += 1
+
+    if sheet is None:
+        workbook.create_sheet("Anmälningar").append(CLAIM_HEADINGS)
+    workbook.save(path)
+    return rows
@@ -0,0 +1,104 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class GroupCommitWriter:
+    """Samlar skrivningar från flera trådar till gemensamma transaktioner
+
+    Anropen köas och en skrivtråd skriver allt som väntar (högst max_batch
+    anmälningar) i en transaktion med en enda commit. Medan en commit pågår
+    fylls kön på, så under last delas kostnaden för varje commit av många
+    anrop. Med max_delay > 0 väntar skrivtråden dessutom så länge på fler
+    anrop innan den skriver.
+    """
+
+    def __init__(self, db_manager, max_batch=2000, max_delay=0.0, name="claims-group-commit"):
+        self.db_manager = db_manager
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, claims):
+        """Köar (date, vehicle_class, claim_amount, description[, idempotency_key])-tupler
+
+        Returnerar en concurrent.futures.Future med anmälningarnas claim_id,
+        i samma ordning, när de är committade. En dubblett får den befintliga
+        anmälans claim_id.
+        """
+        future = Future()
+        self._queue.put((list(claims), future))
+        return future
+
+    def add_claim(self, date, vehicle_class, claim_amount, description="", idempotency_key=None):
+        """Som DatabaseManager.add_claim men via gruppcommit; väntar på resultatet"""
+        claim = (date, vehicle_class, claim_amount, description, idempotency_key)
+        return self.submit([claim]).result()[0]
+
+    def add_claims(self, claims):
+        return self.submit(claims).result()
+
+    def stop(self, timeout=None):
+        """Skriver det som redan är köat och avslutar skrivtråden"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            pending = [item]
+            size = len(item[0])
+            stopping = False
+
+            deadline = time.monotonic() + self.max_delay
+            while size < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            self._write(pending)
+            if stopping:
+                return
+
+    def _write(self, pending):
+        # Avbrutna anrop hoppas över
+        pending = [(claims, future) for claims, future in pending
+                   if future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+
+        try:
+            claim_ids = self.db_manager.add_claims_bulk(
+                [claim for claims, _ in pending for claim in claims], return_ids=True)
+        except Exception as e:
+            if len(pending) == 1:
+                pending[0][1].set_exception(e)
+                return
+            # Skriv anropen var för sig så att bara det felaktiga misslyckas
+            for claims, future in pending:
+                try:
+                    future.set_result(self.db_manager.add_claims_bulk(claims, return_ids=True))
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        # Fördela id:na tillbaka till respektive anrop
+        start = 0
+        for claims, future in pending:
+            future.set_result(claim_ids[start:start + len(claims)])
+            start += len(claims)
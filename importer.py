@@ -0,0 +1,148 @@
+import csv
+from datetime import date as date_type
+from itertools import islice
+
+from validators import ClaimValidator, ERROR_MESSAGES
+
+# Kolumner som förväntas i importfilens rubrikrad
+REQUIRED_COLUMNS = ("date", "vehicle_class", "claim_amount")
+OPTIONAL_COLUMNS = ("description",)
+
+
+class ImportResult:
+    """Sammanställning av en import: antal lagrade, avvisade och redan lagrade rader"""
+
+    def __init__(self, max_rejects=1000):
+        self.imported = 0
+        # Giltiga rader som redan fanns i databasen, t.ex. när en fil importeras igen
+        self.duplicates = 0
+        self.rejected = 0
+        # Endast de första max_rejects avvisningarna hålls i minnet
+        self.rejects = []
+        self.max_rejects = max_rejects
+
+    def add_reject(self, line_number, message):
+        self.rejected += 1
+        if len(self.rejects) < self.max_rejects:
+            self.rejects.append((line_number, message))
+
+    def __repr__(self):
+        return (f"ImportResult(imported={self.imported}, rejected={self.rejected}, "
+                f"duplicates={self.duplicates})")
+
+
+class ClaimImporter:
+    def __init__(self, db_manager, chunk_size=5000, max_rejects=1000):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size
+        self.max_rejects = max_rejects
+
+    def import_csv(self, path, delimiter=",", encoding="utf-8-sig", reject_file=None):
+        """Importerar en CSV-fil i omgångar om chunk_size rader"""
+        with open(path, newline="", encoding=encoding) as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            header = next(reader, None)
+            if header is None:
+                return ImportResult(self.max_rejects)
+            # Rubrikraden är rad 1, data börjar på rad 2
+            rows = enumerate(reader, start=2)
+            return self.import_rows(header, rows, reject_file)
+
+    def import_excel(self, path, sheet_name=None, reject_file=None):
+        """Importerar ett Excel-ark (xlsx) rad för rad i read-only-läge"""
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ImportError("Excel-import kräver paketet openpyxl (pip install openpyxl)")
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            sheet = workbook[sheet_name] if sheet_name else workbook.active
+            values = sheet.iter_rows(values_only=True)
+            header = next(values, None)
+            if header is None:
+                return ImportResult(self.max_rejects)
+            rows = enumerate(values, start=2)
+            return self.import_rows(header, rows, reject_file)
+        finally:
+            workbook.close()
+
+    def import_rows(self, header, numbered_rows, reject_file=None):
+        """Validerar och lagrar (radnummer, rad)-par från valfri källa"""
+        columns = self._map_columns(header)
+        result = ImportResult(self.max_rejects)
+
+        reject_writer = None
+        reject_handle = None
+        if reject_file:
+            reject_handle = open(reject_file, "w", newline="", encoding="utf-8")
+            reject_writer = csv.writer(reject_handle)
+            reject_writer.writerow(["line", "error"])
+
+        try:
+            while True:
+                chunk = list(islice(numbered_rows, self.chunk_size))
+                if not chunk:
+                    break
+
+                line_numbers = [line_number for line_number, _ in chunk]
+                claims = [self._normalize_row(row, columns) for _, row in chunk]
+                dates, vehicle_classes, amounts, descriptions = zip(*claims)
+
+                # Hela omgången valideras i ett svep
+                is_valid, codes, converted = ClaimValidator.validate_claims_batch(
+                    dates, vehicle_classes, amounts)
+
+                valid = []
+                for i, line_number in enumerate(line_numbers):
+                    if is_valid[i]:
+                        valid.append((dates[i], vehicle_classes[i], float(converted[i]),
+                                      descriptions[i]))
+                    else:
+                        message = ERROR_MESSAGES[int(codes[i])]
+                        result.add_reject(line_number, message)
+                        if reject_writer:
+                            reject_writer.writerow([line_number, message])
+
+                if valid:
+                    imported = self.db_manager.add_claims_bulk(valid, self.chunk_size)
+                    result.imported += imported
+                    result.duplicates += len(valid) - imported
+        finally:
+            if reject_handle:
+                reject_handle.close()
+
+        return result
+
+    @staticmethod
+    def _map_columns(header):
+        """Översätter rubrikraden till kolumnindex"""
+        names = [str(name).strip().lower() if name is not None else "" for name in header]
+        missing = [column for column in REQUIRED_COLUMNS if column not in names]
+        if missing:
+            raise ValueError(f"Importfilen saknar kolumner: {', '.join(missing)}")
+        return {column: names.index(column)
+                for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if column in names}
+
+    @staticmethod
+    def _normalize_row(row, columns):
+        """Plockar ut (date, vehicle_class, amount, description) ur en rad"""
+        def cell(column):
+            index = columns.get(column)
+            if index is None or index >= len(row) or row[index] is None:
+                return ""
+            return row[index]
+
+        date = cell("date")
+        # Excel levererar datumceller som datetime-objekt
+        if isinstance(date, date_type):
+            date = date.strftime("%Y-%m-%d")
+        else:
+            date = str(date).strip()
+        vehicle_class = str(cell("vehicle_class")).strip()
+        amount = cell("claim_amount")
+        if not isinstance(amount, (int, float)):
+            amount = str(amount).strip()
+        description = str(cell("description")).strip()
+
+        return date, vehicle_class, amount, description
@@ -1,22 +1,39 @@
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from database import DatabaseManager
+from metrics import METRICS
 from validators import ClaimValidator
-from claims_window import ClaimsWindow
+from claims_window import ClaimsWindow, show_error
+from worker import DatabaseWorker
 
 class ClaimsGUI:
-    def __init__(self, root):
+    def __init__(self, root, metrics_file=None):
         self.root = root
+        # Latens och räknare skrivs hit när programmet stängs (se metrics.py)
+        self.metrics_file = metrics_file
         self.root.title("Skadeanmälan System")
         self.root.geometry("500x400")
         
         # Initiera databashanterare och andra komponenter
         self.db_manager = DatabaseManager()
-        self.claims_window = ClaimsWindow(root, self.db_manager)
+        # Databasanropen körs i en bakgrundstråd så att fönstret inte fryser
+        self.worker = DatabaseWorker(self.db_manager)
+        self.worker.attach(root)
+        self.claims_window = ClaimsWindow(root, self.db_manager, self.worker)
         
         # Skapa GUI-element
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        
+    def close(self):
+        """Väntar in köade databasjobb och stänger programmet"""
+        self.worker.stop()
+        self.db_manager.close()
+        if self.metrics_file:
+            METRICS.write(self.metrics_file)
+        self.root.destroy()
         
     def create_widgets(self):
         """Skapar alla GUI-element"""
@@ -92,51 +109,85 @@ class ClaimsGUI:
                 messagebox.showerror("Fel", result)
                 return
             
-            # Lägg till i databasen
-            claim_id = self.db_manager.add_claim(date, vehicle_class, result, description)
-            
-            # Rensa formuläret
-            self.amount_entry.delete(0, tk.END)
-            self.description_text.delete("1.0", tk.END)
-            
-            # Visa bekräftelse
-            self.status_label.config(text=f"Skadeanmälan lagrad! ID: {claim_id}")
-            messagebox.showinfo("Lyckat", "Skadeanmälan har lagrats i databasen!")
+            # Lägg till i databasen (i bakgrunden)
+            self.run_in_background("Sparar skadeanmälan...", self.db_manager.add_claim,
+                                   date, vehicle_class, result, description,
+                                   return_inserted=True, on_done=self.on_claim_added)
             
         except Exception as e:
-            messagebox.showerror("Fel", f"Ett fel uppstod: {str(e)}")
+            show_error(e)
+    
+    def on_claim_added(self, result):
+        """Anropas i GUI-tråden när skadeanmälan har sparats"""
+        claim_id, inserted = result
+        if not inserted:
+            # Dubblettkontrollen hittade en anmälan med samma innehåll
+            self.status_label.config(text=f"Skadeanmälan redan registrerad! ID: {claim_id}")
+            messagebox.showwarning(
+                "Redan registrerad",
+                f"En likadan skadeanmälan är redan registrerad (ID: {claim_id}) "
+                "och lagrades inte igen. Gäller det en ny skada, skriv en beskrivning "
+                "som skiljer den från den registrerade.")
+            return
+
+        # Rensa formuläret
+        self.amount_entry.delete(0, tk.END)
+        self.description_text.delete("1.0", tk.END)
+        
+        # Visa bekräftelse
+        self.status_label.config(text=f"Skadeanmälan lagrad! ID: {claim_id}")
+        messagebox.showinfo("Lyckat", "Skadeanmälan har lagrats i databasen!")
+    
+    def run_in_background(self, status, func, *args, on_done=None, **kwargs):
+        """Kör ett databasanrop i bakgrundstråden och visar status under tiden"""
+        pending = self.worker.pending()
+        if pending:
+            status = f"{status} ({pending} jobb före i kön)"
+        self.status_label.config(text=status)
+        return self.worker.submit(func, *args, on_done=on_done, on_error=self.on_database_error,
+                                  **kwargs)
+    
+    def on_database_error(self, error):
+        """Visar fel från bakgrundstråden"""
+        self.status_label.config(text="")
+        show_error(error)
     
     def show_all_claims(self):
         """Visar alla skadeanmälningar"""
         try:
             self.claims_window.show_all_claims()
         except Exception as e:
-            messagebox.showerror("Fel", f"Ett fel uppstod: {str(e)}")
+            show_error(e)
     
     def clear_database(self):
         """Rensar databasen efter bekräftelse"""
         if messagebox.askyesno("Bekräfta", "Vill du verkligen rensa alla skadeanmälningar?"):
-            try:
-                self.db_manager.clear_database()
-                self.status_label.config(text="Databasen har rensats!")
-                messagebox.showinfo("Lyckat", "Alla skadeanmälningar har raderats!")
-            except Exception as e:
-                messagebox.showerror("Fel", f"Ett fel uppstod: {str(e)}")
+            self.run_in_background("Rensar databasen...", self.db_manager.clear_database,
+                                   on_done=self.on_database_cleared)
+    
+    def on_database_cleared(self, _):
+        self.status_label.config(text="Databasen har rensats!")
+        messagebox.showinfo("Lyckat", "Alla skadeanmälningar har raderats!")
     
     def reset_database(self):
         """Återställer hela databasen"""
         if messagebox.askyesno("Bekräfta", "Vill du verkligen återställa hela databasen? All data kommer försvinna."):
-            try:
-                self.db_manager.reset_database()
-                self.status_label.config(text="Databasen har återställts!")
-                messagebox.showinfo("Lyckat", "Databasen har återställts med ny struktur!")
-            except Exception as e:
-                messagebox.showerror("Fel", f"Ett fel uppstod: {str(e)}")
+            self.run_in_background("Återställer databasen...", self.db_manager.reset_database,
+                                   on_done=self.on_database_reset)
+    
+    def on_database_reset(self, _):
+        self.status_label.config(text="Databasen har återställts!")
+        messagebox.showinfo("Lyckat", "Databasen har återställts med ny struktur!")
 
-def main():
+def main(argv=None):
     """Startar GUI-applikationen"""
+    parser = argparse.ArgumentParser(description="Skadeanmälan System")
+    parser.add_argument("--metrics", help="fil att skriva latens och räknare till vid "
+                                          "avslut (.json, annars Prometheus-text)")
+    args = parser.parse_args(argv)
+
     root = tk.Tk()
-    app = ClaimsGUI(root)
+    app = ClaimsGUI(root, args.metrics)
     root.mainloop()
 
 if __name__ == "__main__":
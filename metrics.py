@@ -0,0 +1,194 @@
+"""Räknare och latenshistogram för databas-, validerings- och GUI-operationer
+
+Allt registreras i ett MetricsRegistry, normalt modulens METRICS. Registret
+kan skrivas som Prometheus-text (t.ex. för node_exporters textfile-collector)
+eller som JSON. Kommandoraden och GUI:t gör det med --metrics när de avslutas,
+tjänsten visar det under GET /metrics:
+
+    python cli.py --metrics /var/lib/node_exporter/claims.prom import skador.csv
+    python main.py --metrics claims.json
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Övre gränser i sekunder för histogrammens hinkar
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = []
+            total = 0
+            for count in self.counts:
+                total += count
+                cumulative.append(total)
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"],
+                                    cumulative)),
+            }
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def increment(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+
+class MetricsRegistry:
+    """Histogram och räknare, identifierade av namn och etiketter"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def histogram(self, name, **labels):
+        """Returnerar (och skapar vid behov) histogrammet; kan sparas för snabba anrop"""
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def counter(self, name, **labels):
+        key = self._key(name, labels)
+        counter = self._counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter())
+        return counter
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        self.counter(name, **labels).increment(amount)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Mäter tiden för blocket, även om det avbryts av ett undantag"""
+        histogram = self.histogram(name, **labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def reset(self):
+        """Nollställer alla värden
+
+        Histogram och räknare som redan hämtats (t.ex. i validators.py och
+        DatabaseManager) finns kvar i registret och rapporterar som förut.
+        """
+        with self._lock:
+            metrics = list(self._histograms.values()) + list(self._counters.values())
+        for metric in metrics:
+            metric.reset()
+
+    def snapshot(self):
+        """Alla värden som en JSON-vänlig lista"""
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        metrics = []
+        for (name, labels), histogram in sorted(histograms):
+            metrics.append(dict(histogram.snapshot(), name=name, type="histogram",
+                                labels=dict(labels)))
+        for (name, labels), counter in sorted(counters):
+            metrics.append({"name": name, "type": "counter", "labels": dict(labels),
+                            "value": counter.value})
+        return metrics
+
+    def to_prometheus(self):
+        """Alla värden i Prometheus textformat"""
+        lines = []
+        typed = set()
+        for metric in self.snapshot():
+            name = metric["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} {metric['type']}")
+                typed.add(name)
+            labels = metric["labels"]
+            if metric["type"] == "counter":
+                lines.append(f"{name}{_format_labels(labels)} {metric['value']}")
+                continue
+            for bound, count in metric["buckets"].items():
+                lines.append(f"{name}_bucket{_format_labels(dict(labels, le=bound))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {metric['sum']!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {metric['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        _write_atomic(path, self.to_prometheus())
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.snapshot(), indent=2, ensure_ascii=False) + "\n")
+
+    def write(self, path):
+        """Skriver JSON om filen slutar på .json, annars Prometheus-text"""
+        if path.lower().endswith(".json"):
+            self.write_json(path)
+        else:
+            self.write_prometheus(path)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _write_atomic(path, text):
+    # Den som läser filen ska aldrig se en halvskriven version
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# Registret som resten av programmet rapporterar till
+METRICS = MetricsRegistry()
@@ -0,0 +1,318 @@
+"""Versionshantering av databasschemat
+
+Schemaversionen sparas i PRAGMA user_version. Varje steg i MIGRATIONS tar
+databasen från versionen före till versionen efter; stegen körs i ordning,
+vart och ett i en egen transaktion tillsammans med den nya versionen, och
+tål att köras igen. En databas som redan har senaste versionen kostar bara
+en läsning av user_version vid uppstart.
+
+Nya kolumner och index läggs till som nya steg sist i listan (ALTER TABLE
+ADD COLUMN, CREATE INDEX IF NOT EXISTS) så att stora databaser kan
+uppgraderas utan att tabellerna byggs om.
+"""
+import secrets
+
+from claim_statistics import ClaimStatistics
+
+
+class SchemaVersionError(Exception):
+    """Databasen har skapats av en nyare version av programmet"""
+
+
+def _create_claims_table(conn, name="claims"):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS vehicle_classes (
+        vehicle_class_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+    """)
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {name} (
+        claim_id INTEGER PRIMARY KEY,
+        day INTEGER NOT NULL,
+        vehicle_class_id INTEGER NOT NULL REFERENCES vehicle_classes (vehicle_class_id),
+        amount_ore INTEGER NOT NULL,
+        description TEXT
+    )
+    """)
+
+
+def _create_claim_indexes(conn):
+    """Index för datumsortering och filtrering per fordonsklass"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_claims_day ON claims (day)")
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_claims_class_day
+    ON claims (vehicle_class_id, day)
+    """)
+
+
+def _create_statistics(conn):
+    """Statistiktabellerna, fyllda från claims om det redan finns data"""
+    ClaimStatistics.create_tables(conn)
+    has_stats = conn.execute("SELECT EXISTS (SELECT 1 FROM claim_stats)").fetchone()[0]
+    has_claims = conn.execute("SELECT EXISTS (SELECT 1 FROM claims)").fetchone()[0]
+    if has_claims and not has_stats:
+        ClaimStatistics.rebuild(conn)
+
+
+def _create_search_index(conn):
+    """FTS5-index över beskrivningarna, synkat med claims via triggers
+
+    Indexet har extern content (claims) och lagrar alltså inte texten en gång
+    till. Prefixindexen gör sökning medan användaren skriver billig.
+
+    Så länge claims_fts_paused har en rad hoppar insert- och delete-triggern
+    över raderna; bulkinläsning och rensning uppdaterar istället indexet med
+    en enda sats.
+    """
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS claims_fts USING fts5(
+        description, content='claims', content_rowid='claim_id', prefix='2 3'
+    )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS claims_fts_paused (id INTEGER PRIMARY KEY)")
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS claims_fts_insert AFTER INSERT ON claims
+    WHEN NOT EXISTS (SELECT 1 FROM claims_fts_paused) BEGIN
+        INSERT INTO claims_fts (rowid, description) VALUES (new.claim_id, new.description);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS claims_fts_delete AFTER DELETE ON claims
+    WHEN NOT EXISTS (SELECT 1 FROM claims_fts_paused) BEGIN
+        INSERT INTO claims_fts (claims_fts, rowid, description)
+        VALUES ('delete', old.claim_id, old.description);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS claims_fts_update AFTER UPDATE OF description ON claims BEGIN
+        INSERT INTO claims_fts (claims_fts, rowid, description)
+        VALUES ('delete', old.claim_id, old.description);
+        INSERT INTO claims_fts (rowid, description) VALUES (new.claim_id, new.description);
+    END
+    """)
+    # Indexera rader som fanns innan indexet skapades
+    conn.execute("INSERT INTO claims_fts (claims_fts) VALUES ('rebuild')")
+
+
+def _create_archive_registry(conn):
+    """Förteckning över arkivfilerna, en per år (se archive.py)
+
+    run är den senaste avslutade arkiveringen till filen; rader med högre
+    run i filen kommer från en avbruten arkivering och räknas inte.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS claim_archives (
+        year INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        run INTEGER NOT NULL
+    )
+    """)
+
+
+def _add_duplicate_keys(conn):
+    """content_hash och idempotency_key med unika index (se dedup.py)
+
+    Befintliga rader får inget hashvärde här, så att uppgraderingen går fort
+    även för stora tabeller; dedup.find_duplicates fyller i dem.
+    claim_archive_keys har samma nycklar för arkiverade anmälningar.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(claims)")]
+    if "content_hash" not in columns:
+        conn.execute("ALTER TABLE claims ADD COLUMN content_hash INTEGER")
+    if "idempotency_key" not in columns:
+        conn.execute("ALTER TABLE claims ADD COLUMN idempotency_key TEXT")
+    conn.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_claims_content_hash
+    ON claims (content_hash) WHERE content_hash IS NOT NULL
+    """)
+    conn.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_claims_idempotency_key
+    ON claims (idempotency_key) WHERE idempotency_key IS NOT NULL
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS claim_archive_keys (
+        claim_id INTEGER PRIMARY KEY,
+        content_hash INTEGER,
+        idempotency_key TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_claim_archive_keys_hash
+    ON claim_archive_keys (content_hash) WHERE content_hash IS NOT NULL
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_claim_archive_keys_key
+    ON claim_archive_keys (idempotency_key) WHERE idempotency_key IS NOT NULL
+    """)
+
+
+def _create_generation(conn):
+    """Generation för claims-tabellen (se new_generation)"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS claims_generation (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        generation TEXT NOT NULL
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO claims_generation VALUES (1, ?)",
+                 (secrets.token_hex(8),))
+
+
+def new_generation(conn):
+    """Byter generation när anmälningar tas bort
+
+    Data som byggs vidare utifrån senast lästa claim_id, som ögonblicksbilden
+    i snapshot.py, jämför generationen för att veta när det inte räcker att
+    läsa nya rader. Generationen är slumpad, så att den aldrig återkommer
+    efter en återställning.
+    """
+    conn.execute("INSERT OR REPLACE INTO claims_generation VALUES (1, ?)",
+                 (secrets.token_hex(8),))
+
+
+def _create_claim_id_sequence(conn):
+    """Högsta claim_id som delats ut, så att ett id aldrig används två gånger
+
+    Startvärdet tar med arkiverade anmälningar, vars id inte längre finns i claims.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS claim_id_sequence (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_claim_id INTEGER NOT NULL
+    )
+    """)
+    conn.execute("""
+    INSERT OR IGNORE INTO claim_id_sequence
+    SELECT 1, max(coalesce((SELECT max(claim_id) FROM claims), 0),
+                  coalesce((SELECT max(claim_id) FROM claim_archive_keys), 0))
+    """)
+
+
+def record_last_claim_id(conn):
+    """Sparar högsta claim_id i claim_id_sequence; anropas innan rader tas bort ur claims"""
+    conn.execute("""
+    UPDATE claim_id_sequence
+    SET last_claim_id = max(last_claim_id, coalesce((SELECT max(claim_id) FROM claims), 0))
+    """)
+
+
+def recreate_claims_table(conn):
+    """Tömmer claims genom att ta bort och skapa om tabellen med index och sökindex
+
+    Det går mycket fortare än DELETE, som tar bort raderna en i taget.
+    """
+    conn.execute("DROP TABLE IF EXISTS claims_fts")
+    conn.execute("DROP TABLE IF EXISTS claims")
+    _create_claims_table(conn)
+    _create_claim_indexes(conn)
+    _create_search_index(conn)
+    _add_duplicate_keys(conn)
+
+
+# Ordnade steg; steg nummer i (räknat från 1) ger schemaversion i
+MIGRATIONS = [
+    _create_claims_table,
+    _create_claim_indexes,
+    _create_statistics,
+    _create_search_index,
+    _create_archive_registry,
+    _add_duplicate_keys,
+    _create_generation,
+    _create_claim_id_sequence,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def upgrade(db_manager):
+    """Kör de migreringssteg som databasen saknar, returnerar schemaversionen"""
+    conn = db_manager.get_connection()
+    version = get_schema_version(conn)
+    if version == SCHEMA_VERSION:
+        return version
+    if version > SCHEMA_VERSION:
+        raise SchemaVersionError(f"Databasen har schemaversion {version}, "
+                                 f"programmet stöder högst {SCHEMA_VERSION}")
+
+    if version == 0 and has_legacy_claims_table(conn):
+        # Databas från tiden före versionshanteringen, med text-datum och REAL-belopp
+        migrate_legacy_claims(db_manager)
+
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        with db_manager.transaction() as conn:
+            # En annan process kan ha hunnit före
+            if get_schema_version(conn) >= number:
+                continue
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+
+    return SCHEMA_VERSION
+
+
+def has_legacy_claims_table(conn):
+    """True om claims-tabellen har den gamla layouten med text-datum"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(claims)")]
+    return "date" in columns
+
+
+def migrate_legacy_claims(db_manager, batch_size=50000):
+    """Flyttar alla rader från den gamla claims-tabellen till det kompakta schemat
+
+    Den gamla tabellen hade datum som text (YYYY-MM-DD), belopp som REAL och
+    fordonsklassen som text på varje rad. Raderna kopieras i omgångar om
+    batch_size till claims_compact; varje omgång committas för sig och den
+    senast kopierade claim_id sparas i claims_migration. Avbryts migreringen
+    fortsätter nästa start där den slutade.
+
+    Varje omgång kontrollerar först att den gamla tabellen finns kvar, så
+    att två processer som startar samtidigt delar på omgångarna och den som
+    kommer för sent slutar när den andra har bytt tabell.
+    """
+    with db_manager.transaction() as conn:
+        if not has_legacy_claims_table(conn):
+            return
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS claims_migration (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_claim_id INTEGER NOT NULL
+        )
+        """)
+        conn.execute("INSERT OR IGNORE INTO claims_migration VALUES (1, 0)")
+        _create_claims_table(conn, "claims_compact")
+
+    while True:
+        with db_manager.transaction() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(claims)")]
+            if "date" not in columns:
+                # En annan process har redan migrerat
+                return
+            # Mycket gamla databaser saknar beskrivningskolumnen
+            description = "description" if "description" in columns else "''"
+
+            last_id = conn.execute(
+                "SELECT last_claim_id FROM claims_migration WHERE id = 1").fetchone()[0]
+            rows = conn.execute(f"""
+            SELECT claim_id, date, vehicle_class, claim_amount, {description}
+            FROM claims WHERE claim_id > ? ORDER BY claim_id LIMIT ?
+            """, (last_id, batch_size)).fetchall()
+            if not rows:
+                # Byt tabell; de gamla indexen försvinner med tabellen och skapas
+                # på nytt av migreringsstegen, liksom statistiken från de avrundade beloppen
+                conn.execute("DROP TABLE claims")
+                conn.execute("ALTER TABLE claims_compact RENAME TO claims")
+                conn.execute("DROP TABLE claims_migration")
+                ClaimStatistics.drop_tables(conn)
+                return
+
+            encoded, _ = db_manager._encode_claims(conn, [row[1:] for row in rows])
+            conn.executemany("""
+            INSERT INTO claims_compact (claim_id, day, vehicle_class_id, amount_ore, description)
+            VALUES (?, ?, ?, ?, ?)
+            """, [(row[0],) + values[:4] for row, values in zip(rows, encoded)])
+            conn.execute("UPDATE claims_migration SET last_claim_id = ? WHERE id = 1",
+                         (rows[-1][0],))
@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+
+
+class QueryCache:
+    """LRU-cache för frågeresultat, kopplad till databasens dataversion
+
+    Varje post sparas tillsammans med dataversionen när frågan ställdes och
+    räknas som en miss om databasen har ändrats sedan dess. Storleken
+    begränsas både i antal poster och i totalt antal rader. Resultaten delas
+    mellan anroparna och får inte ändras.
+    """
+
+    def __init__(self, max_entries=256, max_rows=100000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        # nyckel -> (dataversion, antal rader, resultat), äldst först
+        self._entries = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, version, load):
+        """Returnerar det cachade resultatet för key, eller load() vid miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        result = load()
+        self.put(key, version, result)
+        return result
+
+    def put(self, key, version, result):
+        size = len(result) if isinstance(result, list) else 1
+        if self.max_entries <= 0 or size > self.max_rows:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._rows -= old[1]
+            self._entries[key] = (version, size, result)
+            self._rows += size
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                _, (_, size, _) = self._entries.popitem(last=False)
+                self._rows -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self):
+        """Träffar, missar och nuvarande storlek"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "rows": self._rows,
+            }
@@ -0,0 +1,296 @@
+"""HTTP/JSON-tjänst för skadeanmälningar utan GUI
+
+    POST /claims   en anmälan (JSON-objekt) eller flera (JSON-lista); med
+                   "idempotency_key" kan en anmälan skickas om utan att
+                   lagras två gånger
+    GET  /claims   filtrerad lista med keyset-paginering
+    GET  /stats    statistik per fordonsklass (?monthly=1 för per månad)
+    GET  /metrics  latens och räknare i Prometheus-format (?format=json för JSON)
+
+Alla skrivningar går genom en GroupCommitWriter som slår ihop samtidiga
+anmälningar till en gemensam commit (group commit).
+
+Startas med:  python service.py --port 8080 --db claims.db
+"""
+import argparse
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from database import DatabaseManager
+from group_commit import GroupCommitWriter
+from validators import ClaimValidator, ERROR_MESSAGES, ERROR_AMOUNT_FORMAT
+
+MAX_BODY_SIZE = 10 * 2**20
+MAX_PAGE_SIZE = 1000
+
+STATUS_TEXTS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ClaimsService:
+    def __init__(self, db_manager, max_batch=2000, read_threads=4):
+        self.db_manager = db_manager
+        # Skrivningarna går genom skrivarens tråd, läsningarna genom några egna
+        # (WAL tillåter båda samtidigt)
+        self.writer = GroupCommitWriter(db_manager, max_batch)
+        self._read_executor = ThreadPoolExecutor(read_threads, thread_name_prefix="claims-reader")
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """Startar HTTP-servern"""
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def stop(self):
+        self.writer.stop()
+        self._read_executor.shutdown(wait=True)
+
+    # --- Skrivare ---
+
+    async def add_claims(self, claims):
+        """Köar validerade anmälningar och väntar tills de är committade"""
+        return await asyncio.wrap_future(self.writer.submit(claims))
+
+    # --- Routing ---
+
+    async def dispatch(self, method, target, body):
+        """Returnerar (status, JSON-svar) för en förfrågan"""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/claims":
+            if method == "POST":
+                return await self._post_claims(body)
+            if method == "GET":
+                return 200, await self._read(self._get_claims, query)
+            raise HTTPError(405, "Metoden stöds inte")
+        if url.path == "/stats":
+            if method == "GET":
+                return 200, await self._read(self._get_stats, query)
+            raise HTTPError(405, "Metoden stöds inte")
+        if url.path == "/metrics":
+            if method == "GET":
+                if query.get("format") == "json":
+                    return 200, {"metrics": self.db_manager.metrics.snapshot()}
+                return 200, self.db_manager.metrics.to_prometheus()
+            raise HTTPError(405, "Metoden stöds inte")
+        raise HTTPError(404, "Okänd sökväg")
+
+    async def _read(self, func, query):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, func, query)
+
+    async def _post_claims(self, body):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "Ogiltig JSON")
+
+        if isinstance(data, dict):
+            claim = self._parse_claim(data)
+            is_valid, result = ClaimValidator.validate_claim_data(*claim[:3])
+            if not is_valid:
+                raise HTTPError(400, result)
+            claim_ids = await self.add_claims([(claim[0], claim[1], result, *claim[3:])])
+            return 201, {"claim_id": claim_ids[0]}
+
+        if isinstance(data, list):
+            claims = [self._parse_claim(item) for item in data]
+            if not claims:
+                return 201, {"claim_ids": [], "rejected": []}
+            dates, vehicle_classes, amounts, descriptions, keys = zip(*claims)
+            valid, codes, converted = ClaimValidator.validate_claims_batch(
+                dates, vehicle_classes, amounts)
+
+            accepted = []
+            rejected = []
+            for i in range(len(claims)):
+                if valid[i]:
+                    accepted.append((dates[i], vehicle_classes[i], converted[i], descriptions[i],
+                                     keys[i]))
+                else:
+                    rejected.append({"index": i, "error": ERROR_MESSAGES[int(codes[i])]})
+
+            claim_ids = await self.add_claims(accepted) if accepted else []
+            return 201, {"claim_ids": claim_ids, "rejected": rejected}
+
+        raise HTTPError(400, "Förväntade ett JSON-objekt eller en lista")
+
+    @staticmethod
+    def _parse_claim(item):
+        """Plockar ut (date, vehicle_class, claim_amount, description, idempotency_key)
+        ur ett JSON-objekt"""
+        if not isinstance(item, dict):
+            raise HTTPError(400, "Varje anmälan måste vara ett JSON-objekt")
+        date = item.get("date") or ""
+        vehicle_class = item.get("vehicle_class") or ""
+        amount = item.get("claim_amount") or ""
+        description = item.get("description") or ""
+        key = item.get("idempotency_key")
+        if not isinstance(date, str) or not isinstance(vehicle_class, str):
+            raise HTTPError(400, "date och vehicle_class måste vara strängar")
+        if not isinstance(amount, (str, int, float)) or isinstance(amount, bool):
+            raise HTTPError(400, ERROR_MESSAGES[ERROR_AMOUNT_FORMAT])
+        if key is not None and (not isinstance(key, str) or not key):
+            raise HTTPError(400, "idempotency_key måste vara en icke-tom sträng")
+        return date, vehicle_class, amount, str(description), key
+
+    def _get_claims(self, query):
+        try:
+            limit = int(query.get("limit", 100))
+            # LIMIT -1 betyder "utan gräns" i SQLite
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                raise HTTPError(400, f"limit måste vara mellan 1 och {MAX_PAGE_SIZE}")
+            min_amount = float(query["min_amount"]) if "min_amount" in query else None
+            after = None
+            if "after_date" in query and "after_id" in query:
+                after = (query["after_date"], int(query["after_id"]))
+            rows = self.db_manager.query_claims(
+                vehicle_class=query.get("vehicle_class"),
+                date_from=query.get("date_from"),
+                date_to=query.get("date_to"),
+                min_amount=min_amount,
+                limit=limit,
+                order=query.get("order", "date_desc"),
+                after=after,
+            )
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        next_page = None
+        if len(rows) == limit:
+            next_page = {"after_date": rows[-1][1], "after_id": rows[-1][0]}
+        return {"claims": [claim_to_dict(row) for row in rows], "next": next_page}
+
+    def _get_stats(self, query):
+        if query.get("monthly") in ("1", "true"):
+            return {"monthly": self.db_manager.get_monthly_statistics(query.get("vehicle_class"))}
+        return {"classes": self.db_manager.get_class_statistics()}
+
+    # --- HTTP ---
+
+    async def _handle_connection(self, reader, writer):
+        """Hanterar en anslutning; HTTP/1.1 keep-alive stöds"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    self._write_response(writer, 400, {"error": "Ogiltig förfrågan"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (version == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close")
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length > MAX_BODY_SIZE:
+                        raise HTTPError(413, "För stor förfrågan")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                    if e.status == 413:
+                        keep_alive = False
+                except ValueError:
+                    status, payload, keep_alive = 400, {"error": "Ogiltig Content-Length"}, False
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    status, payload = 500, {"error": f"Ett fel uppstod: {str(e)}"}
+
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        # Text skickas som den är (Prometheus-formatet), allt annat som JSON
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXTS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+
+def claim_to_dict(row):
+    claim_id, date, vehicle_class, claim_amount, description = row
+    return {
+        "claim_id": claim_id,
+        "date": date,
+        "vehicle_class": vehicle_class,
+        "claim_amount": claim_amount,
+        "description": description,
+    }
+
+
+async def serve(db_name, host, port, slow_query_ms=None):
+    service = ClaimsService(DatabaseManager(db_name, slow_query_ms=slow_query_ms))
+    server = await service.start(host, port)
+    print(f"Lyssnar på http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        service.db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON-tjänst för skadeanmälningar")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default="claims.db")
+    parser.add_argument("--slow-query-ms", type=float,
+                        help="logga SQL-satser som tar längre tid än så här")
+    args = parser.parse_args()
+
+    if args.slow_query_ms is not None:
+        logging.basicConfig(level=logging.WARNING)
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.slow_query_ms))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Kolumnorienterad ögonblicksbild av claims-tabellen för analys
+
+Varje kolumn ligger i en egen fil med fast bredd (little endian) och kan
+öppnas med numpy.memmap utan att data kopieras:
+
+    claim_id.i8       int64, stigande
+    day.i4            int32, dagar sedan 1970-01-01
+    amount_ore.i8     int64, belopp i öre
+    vehicle_class.u2  uint16, index i meta.json:s vehicle_classes
+
+meta.json håller antal rader, senaste claim_id, databasens generation och
+klassordboken. Den skrivs om sist vid varje uppdatering, så en avbruten
+uppdatering lämnar bara rader som ignoreras och skrivs över nästa gång.
+"""
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from claim_statistics import ClaimStatistics
+
+COLUMNS = {
+    "claim_id": "<i8",
+    "day": "<i4",
+    "amount_ore": "<i8",
+    "vehicle_class": "<u2",
+}
+
+META_FILE = "meta.json"
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Ögonblicksbilden kräver paketet numpy (pip install numpy)")
+
+
+def _column_file(path, name):
+    return os.path.join(path, f"{name}.{COLUMNS[name][1:]}")
+
+
+class ClaimSnapshot:
+    """En öppnad ögonblicksbild; kolumnerna är numpy.memmap-arrayer"""
+
+    def __init__(self, path):
+        _require_numpy()
+        self.path = path
+        self.meta = ClaimSnapshot._read_meta(path)
+        self.rows = self.meta["rows"]
+        self.vehicle_classes = self.meta["vehicle_classes"]
+        for name, dtype in COLUMNS.items():
+            if self.rows:
+                column = np.memmap(_column_file(path, name), dtype=dtype, mode="r",
+                                   shape=(self.rows,))
+            else:
+                column = np.empty(0, dtype=dtype)
+            setattr(self, name, column)
+
+    @staticmethod
+    def _read_meta(path):
+        try:
+            with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"rows": 0, "last_claim_id": 0, "generation": None, "vehicle_classes": []}
+
+    @staticmethod
+    def update(db_manager, path, chunksize=100000):
+        """Skapar eller uppdaterar ögonblicksbilden i katalogen path
+
+        Bara rader med claim_id efter den senaste i bilden läses från
+        databasen. Har anmälningar tagits bort sedan förra gången (rensning,
+        återställning eller borttagna dubbletter) har databasen bytt generation,
+        och då byggs bilden om från början. Returnerar den öppnade bilden.
+        """
+        _require_numpy()
+        os.makedirs(path, exist_ok=True)
+        meta = ClaimSnapshot._read_meta(path)
+
+        # Bilden gäller så länge inga anmälningar har tagits bort; arkiverade
+        # anmälningar läses fortfarande av iter_raw_claims och räknas som kvar.
+        # Generationen läses före raderna; byts den under tiden byggs bilden om nästa gång
+        generation = db_manager.get_generation()
+        if meta.get("generation") != generation:
+            meta = {"rows": 0, "last_claim_id": 0, "generation": generation,
+                    "vehicle_classes": []}
+
+        codes = {name: code for code, name in enumerate(meta["vehicle_classes"])}
+        class_names = db_manager.get_vehicle_classes()
+        class_codes = {}
+
+        files = {}
+        try:
+            for name, dtype in COLUMNS.items():
+                f = open(_column_file(path, name), "ab")
+                # Ta bort rader från en tidigare avbruten uppdatering
+                f.truncate(meta["rows"] * np.dtype(dtype).itemsize)
+                files[name] = f
+
+            for rows in db_manager.iter_raw_claims(chunksize, meta["last_claim_id"]):
+                claim_ids, days, class_ids, amounts, _ = zip(*rows)
+                for class_id in set(class_ids) - class_codes.keys():
+                    if class_id not in class_names:
+                        class_names = db_manager.get_vehicle_classes()
+                    name = class_names[class_id]
+                    if name not in codes:
+                        codes[name] = len(meta["vehicle_classes"])
+                        meta["vehicle_classes"].append(name)
+                    class_codes[class_id] = codes[name]
+
+                np.array(claim_ids, dtype=COLUMNS["claim_id"]).tofile(files["claim_id"])
+                np.array(days, dtype=COLUMNS["day"]).tofile(files["day"])
+                np.array(amounts, dtype=COLUMNS["amount_ore"]).tofile(files["amount_ore"])
+                np.array([class_codes[class_id] for class_id in class_ids],
+                         dtype=COLUMNS["vehicle_class"]).tofile(files["vehicle_class"])
+                meta["rows"] += len(rows)
+                meta["last_claim_id"] = claim_ids[-1]
+        finally:
+            for f in files.values():
+                f.close()
+
+        # Metadatan ersätts atomärt när alla kolumner är skrivna
+        tmp = os.path.join(path, META_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(path, META_FILE))
+
+        return ClaimSnapshot(path)
+
+    def class_statistics(self):
+        """Antal, summa, medel, min, max och varians per fordonsklass
+
+        Samma form som DatabaseManager.get_class_statistics.
+        """
+        return self._group_statistics(self.vehicle_class.astype(np.intp), self.amount_ore,
+                                      lambda key: {"vehicle_class": self.vehicle_classes[key]})
+
+    def monthly_statistics(self, vehicle_class=None):
+        """Samma mått per fordonsklass och månad (YYYY-MM)"""
+        classes = self.vehicle_class
+        days = self.day
+        amounts_ore = self.amount_ore
+        if vehicle_class is not None:
+            if vehicle_class not in self.vehicle_classes:
+                return []
+            mask = classes == self.vehicle_classes.index(vehicle_class)
+            classes, days, amounts_ore = classes[mask], days[mask], amounts_ore[mask]
+
+        # Månader sedan 1970-01, kombinerat med klassen till en grupp
+        months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        first_month = months.min() if len(months) else 0
+        span = int(months.max() - first_month + 1) if len(months) else 1
+        keys = classes.astype(np.int64) * span + (months - first_month)
+
+        def describe(key):
+            code, month = divmod(int(key), span)
+            month_start = np.datetime64(int(first_month + month), "M")
+            return {"vehicle_class": self.vehicle_classes[code], "month": str(month_start)}
+
+        return self._group_statistics(keys, amounts_ore, describe)
+
+    def _group_statistics(self, keys, amounts_ore, describe):
+        """Aggregerar beloppen per nyckel; describe(nyckel) ger gruppens namn"""
+        if not len(keys):
+            return []
+
+        # Nycklarna är små heltal, så bincount räcker och ingen sortering behövs
+        amounts = amounts_ore / 100
+        counts = np.bincount(keys)
+        totals = np.bincount(keys, weights=amounts)
+        squares = np.bincount(keys, weights=amounts * amounts)
+        minimums = np.full(len(counts), np.inf)
+        maximums = np.full(len(counts), -np.inf)
+        np.minimum.at(minimums, keys, amounts)
+        np.maximum.at(maximums, keys, amounts)
+
+        statistics = [
+            ClaimStatistics.summarize(
+                (int(counts[key]), float(totals[key]), float(squares[key]),
+                 float(minimums[key]), float(maximums[key])),
+                **describe(key))
+            for key in np.flatnonzero(counts)
+        ]
+        # Samma ordning som sammanfattningstabellerna
+        statistics.sort(key=lambda row: (row["vehicle_class"], row.get("month", "")))
+        return statistics
@@ -0,0 +1,96 @@
+"""Tester för arkivering: läsningarna ska ge samma svar före och efter"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from database import DatabaseManager
+
+CLASSES = ["Car", "Truck", "Bus"]
+
+
+def make_claims(first_year, last_year):
+    claims = []
+    for year in range(first_year, last_year + 1):
+        for i in range(6):
+            claims.append((f"{year}-{i * 2 + 1:02d}-{i + 10:02d}", CLASSES[i % 3],
+                           100 + year + i, f"skada {year} nummer {i}"))
+            # Två anmälningar samma dag, så att claim_id avgör ordningen
+            claims.append((f"{year}-{i * 2 + 1:02d}-{i + 10:02d}", CLASSES[i % 3],
+                           200 + year + i, f"skada {year} extra {i}"))
+    return claims
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        # Utan frågecache, så att varje läsning går till claims och arkiven
+        self.db_manager = DatabaseManager(os.path.join(self.tmp, "claims.db"),
+                                          query_cache_entries=0)
+        self.addCleanup(self.db_manager.close)
+        # Fler år än SQLite kan koppla in med ATTACH på en gång
+        self.db_manager.add_claims_bulk(make_claims(2008, 2024))
+
+    def read_all(self):
+        db_manager = self.db_manager
+        return {
+            "all": db_manager.get_all_claims(),
+            "car": db_manager.query_claims(vehicle_class="Car"),
+            "range": db_manager.query_claims(date_from="2019-03-01", date_to="2022-07-31",
+                                             order="date_asc"),
+            "min_amount": db_manager.query_claims(min_amount=2220, limit=7),
+            "search": sorted(db_manager.search_claims("extra", vehicle_class="Bus", limit=None)),
+            "statistics": db_manager.get_class_statistics(),
+            "monthly": db_manager.get_monthly_statistics("Truck"),
+            "iter": [row for chunk in db_manager.iter_claims(chunksize=25) for row in chunk],
+        }
+
+    def pages(self, limit, **filters):
+        rows = []
+        after = None
+        while True:
+            if filters:
+                page = self.db_manager.query_claims(limit=limit, after=after, **filters)
+            else:
+                page = self.db_manager.get_claims_page(limit, after=after)
+            if not page:
+                return rows
+            rows.extend(page)
+            after = (page[-1][1], page[-1][0])
+
+    def test_reads_are_unchanged(self):
+        before = self.read_all()
+        self.assertEqual(self.db_manager.archive_claims("2022-01-01"), 14 * 12)
+        archives = self.db_manager.get_connection().execute(
+            "SELECT count(*) FROM claim_archives").fetchone()[0]
+        self.assertEqual(archives, 14)
+        self.assertEqual(self.read_all(), before)
+
+    def test_keyset_paging_across_archives(self):
+        everything = self.db_manager.get_all_claims()
+        ascending = self.db_manager.query_claims(order="date_asc")
+        self.db_manager.archive_claims("2022-01-01")
+
+        for limit in (1, 5, 13, 200):
+            self.assertEqual(self.pages(limit), everything)
+            self.assertEqual(self.pages(limit, order="date_asc"), ascending)
+
+        # Bakåt från sista sidan kommer samma rader i samma ordning
+        last = everything[-5:]
+        self.assertEqual(self.db_manager.get_claims_page(5, after=(everything[-6][1],
+                                                                    everything[-6][0])), last)
+        self.assertEqual(self.db_manager.get_claims_page(5, before=(last[0][1], last[0][0])),
+                         everything[-10:-5])
+
+    def test_archiving_again_adds_to_the_same_file(self):
+        self.db_manager.archive_claims("2022-01-01")
+        claim_id = self.db_manager.add_claim("2019-12-31", "Car", 5, "sent inlämnad")
+        before = self.read_all()
+        self.assertEqual(self.db_manager.archive_claims("2022-01-01"), 1)
+        self.assertEqual(self.read_all(), before)
+        self.assertEqual([row[0] for row in self.db_manager.search_claims("sent")], [claim_id])
+
+
+if __name__ == "__main__":
+    unittest.main()
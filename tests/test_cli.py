@@ -0,0 +1,38 @@
+"""Tester för kommandoraden i cli.py"""
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import cli
+
+
+class AddCommandTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.db_name = os.path.join(self.tmp, "claims.db")
+
+    def run_cli(self, *argv):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            status = cli.main(["--db", self.db_name, *argv])
+        return status, stdout.getvalue(), stderr.getvalue()
+
+    def test_repeated_claim_is_reported(self):
+        self.assertEqual(self.run_cli("add", "2024-01-15", "Car", "12500"), (0, "1\n", ""))
+        status, stdout, stderr = self.run_cli("add", "2024-01-15", "Car", "12500")
+        self.assertEqual((status, stdout), (0, "1\n"))
+        self.assertIn("redan registrerad", stderr)
+
+    def test_metrics_are_written_after_the_command(self):
+        path = os.path.join(self.tmp, "claims.prom")
+        self.run_cli("--metrics", path, "add", "2024-01-15", "Car", "12500")
+        with open(path, encoding="utf-8") as f:
+            self.assertIn('claims_operation_seconds_count{operation="commit"}', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Tester för DatabaseManager med flera anslutningar mot samma fil"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from importer import ClaimImporter
+
+
+class DatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_name = os.path.join(self.tmp, "claims.db")
+        self.db_manager = self.open_manager()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def open_manager(self):
+        db_manager = DatabaseManager(self.db_name)
+        self.addCleanup(db_manager.close)
+        return db_manager
+
+
+class VehicleClassCacheTest(DatabaseTestCase):
+    def test_reset_in_other_manager_does_not_mix_up_classes(self):
+        other = self.open_manager()
+        self.db_manager.add_claim("2024-01-01", "Car", 10, "")
+        # Efter återställningen får Truck id 1, som Car hade
+        other.reset_database()
+        other.add_claim("2024-01-01", "Truck", 20, "")
+        self.db_manager.add_claim("2024-01-02", "Car", 30, "")
+
+        for db_manager in (self.db_manager, other):
+            claims = {row[3]: row[2] for row in db_manager.get_all_claims()}
+            self.assertEqual(claims, {20.0: "Truck", 30.0: "Car"})
+        statistics = {row["vehicle_class"]: row["count"]
+                      for row in self.db_manager.get_class_statistics()}
+        self.assertEqual(statistics, {"Car": 1, "Truck": 1})
+
+    def test_reset_in_other_manager_does_not_mix_up_class_filters(self):
+        other = self.open_manager()
+        self.db_manager.add_claim("2024-01-01", "Car", 10, "plåtskada")
+        self.db_manager.add_claim("2024-01-01", "Truck", 20, "plåtskada")
+        self.assertEqual(len(self.db_manager.query_claims(vehicle_class="Truck")), 1)
+        # Efter återställningen får Truck id 1 och Car id 2, tvärtom mot förut
+        other.reset_database()
+        other.add_claim("2024-01-02", "Truck", 30, "plåtskada")
+        other.add_claim("2024-01-02", "Car", 40, "plåtskada")
+
+        claims = self.db_manager.query_claims(vehicle_class="Truck")
+        self.assertEqual([(row[2], row[3]) for row in claims], [("Truck", 30.0)])
+        claims = self.db_manager.search_claims("plåt", vehicle_class="Car")
+        self.assertEqual([(row[2], row[3]) for row in claims], [("Car", 40.0)])
+
+
+class DuplicateClaimTest(DatabaseTestCase):
+    def test_add_claim_reports_duplicates(self):
+        self.assertEqual(self.db_manager.add_claim("2024-01-01", "Car", 10, "",
+                                                   return_inserted=True), (1, True))
+        self.assertEqual(self.db_manager.add_claim("2024-01-01", "Car", 10, "",
+                                                   return_inserted=True), (1, False))
+        self.assertEqual(self.db_manager.add_claim("2024-01-01", "Car", 10, "bakre stötfångare",
+                                                   return_inserted=True), (2, True))
+        self.assertEqual(self.db_manager.add_claim("2024-01-01", "Car", 10, ""), 1)
+
+
+class ImportAmountTest(DatabaseTestCase):
+    def test_out_of_range_amounts_are_rejected_per_row(self):
+        rows = enumerate([["2024-01-01", "Car", "100"], ["2024-01-01", "Car", "1e17"],
+                          ["2024-01-01", "Car", "inf"], ["2024-01-01", "Car", "nan"],
+                          ["2024-01-02", "Car", "9e16"]], start=2)
+        result = ClaimImporter(self.db_manager).import_rows(
+            ["date", "vehicle_class", "claim_amount"], rows)
+        self.assertEqual((result.imported, result.rejected), (2, 3))
+        self.assertEqual([line for line, _ in result.rejects], [3, 4, 5])
+        self.assertEqual(sorted(row[3] for row in self.db_manager.get_all_claims()),
+                         [100.0, 9e16])
+
+
+class ClaimIdTest(DatabaseTestCase):
+    def test_removed_highest_claim_id_is_not_reused(self):
+        # Äldre rader utan hashvärde; den sista är en dubblett av den första
+        with self.db_manager.transaction() as conn:
+            class_id = self.db_manager._vehicle_class_id(conn, "Car", create=True)
+            conn.executemany("""
+            INSERT INTO claims (day, vehicle_class_id, amount_ore, description) VALUES (?, ?, ?, ?)
+            """, [(19723, class_id, 100, "x"), (17897, class_id, 200, ""),
+                  (19723, class_id, 100, "x")])
+        self.db_manager.archive_claims("2020-01-01")
+        self.assertEqual(self.db_manager.find_duplicates(remove=True), [(3, 1)])
+
+        self.assertEqual(self.db_manager.add_claim("2024-02-01", "Car", 5, ""), 4)
+        self.assertEqual(self.db_manager.add_claims_bulk([("2024-02-02", "Car", 6, "")]), 1)
+        claim_ids = [row[0] for row in self.db_manager.get_all_claims()]
+        self.assertEqual(sorted(claim_ids), [1, 2, 4, 5])
+
+    def test_archived_highest_claim_id_is_not_reused(self):
+        self.db_manager.add_claims_bulk([("2024-01-01", "Car", 1, ""),
+                                         ("2019-01-01", "Car", 2, "")])
+        self.assertEqual(self.db_manager.archive_claims("2020-01-01"), 1)
+        self.assertEqual(self.db_manager.add_claim("2024-01-02", "Car", 3, ""), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
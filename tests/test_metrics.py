@@ -0,0 +1,45 @@
+"""Tester för MetricsRegistry"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from metrics import MetricsRegistry
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def test_reset_keeps_existing_handles(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("claims_operation_seconds", operation="validation")
+        counter = registry.counter("claims_errors_total", source="gui")
+        histogram.observe(0.002)
+        counter.increment()
+
+        registry.reset()
+        self.assertEqual([metric.get("count", metric.get("value"))
+                          for metric in registry.snapshot()], [0, 0])
+
+        # Handtagen som hämtades före nollställningen rapporterar fortfarande
+        histogram.observe(0.002)
+        counter.increment(2)
+        text = registry.to_prometheus()
+        self.assertIn('claims_operation_seconds_count{operation="validation"} 1', text)
+        self.assertIn('claims_errors_total{source="gui"} 2', text)
+
+    def test_write_chooses_format_by_extension(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        registry = MetricsRegistry()
+        registry.increment("claims_busy_retries_total")
+
+        registry.write(os.path.join(tmp, "claims.json"))
+        with open(os.path.join(tmp, "claims.json"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)[0]["value"], 1)
+        registry.write(os.path.join(tmp, "claims.prom"))
+        with open(os.path.join(tmp, "claims.prom"), encoding="utf-8") as f:
+            self.assertIn("claims_busy_retries_total 1", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
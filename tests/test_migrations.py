@@ -0,0 +1,174 @@
+"""Tester för migreringen från den gamla claims-tabellen med text-datum"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import migrations
+from database import DatabaseManager
+
+
+class LegacyMigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.db_name = os.path.join(self.tmp, "claims.db")
+
+    def create_legacy_database(self, rows):
+        # Den ursprungliga tabellen, som databasen såg ut före versionshanteringen
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("""
+        CREATE TABLE claims (
+            claim_id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            vehicle_class TEXT NOT NULL,
+            claim_amount REAL NOT NULL,
+            description TEXT
+        )
+        """)
+        conn.executemany("""
+        INSERT INTO claims (date, vehicle_class, claim_amount, description) VALUES (?, ?, ?, ?)
+        """, [(f"2024-01-{i % 28 + 1:02d}", ("Car", "Truck")[i % 2], 100.25 + i, f"skada {i}")
+              for i in range(rows)])
+        conn.commit()
+        conn.close()
+
+    def open_manager(self):
+        db_manager = DatabaseManager(self.db_name)
+        self.addCleanup(db_manager.close)
+        return db_manager
+
+    def assert_migrated(self, db_manager, rows):
+        conn = db_manager.get_connection()
+        self.assertEqual(migrations.get_schema_version(conn), migrations.SCHEMA_VERSION)
+        self.assertFalse(migrations.has_legacy_claims_table(conn))
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        self.assertNotIn("claims_compact", tables)
+        self.assertNotIn("claims_migration", tables)
+
+        claims = db_manager.get_all_claims()
+        self.assertEqual(sorted(row[0] for row in claims), list(range(1, rows + 1)))
+        claim = next(row for row in claims if row[0] == 4)
+        self.assertEqual(claim[1:], ("2024-01-04", "Truck", 103.25, "skada 3"))
+        statistics = {row["vehicle_class"]: row["count"]
+                      for row in db_manager.get_class_statistics()}
+        self.assertEqual(statistics, {"Car": (rows + 1) // 2, "Truck": rows // 2})
+        self.assertEqual(len(db_manager.search_claims("skada")), min(rows, 100))
+
+    def test_legacy_table_is_migrated(self):
+        self.create_legacy_database(1000)
+        self.assert_migrated(self.open_manager(), 1000)
+
+    def test_interrupted_migration_resumes(self):
+        self.create_legacy_database(1000)
+        migrate = migrations.migrate_legacy_claims
+        encode = DatabaseManager._encode_claims
+        calls = []
+
+        def encode_once(db_manager, conn, claims):
+            calls.append(len(claims))
+            if len(calls) > 1:
+                raise KeyboardInterrupt
+            return encode(db_manager, conn, claims)
+
+        with mock.patch.object(migrations, "migrate_legacy_claims",
+                               lambda db_manager: migrate(db_manager, batch_size=300)), \
+                mock.patch.object(DatabaseManager, "_encode_claims", encode_once):
+            with self.assertRaises(KeyboardInterrupt):
+                DatabaseManager(self.db_name)
+
+        # Första omgången är committad, den andra rullades tillbaka
+        conn = sqlite3.connect(self.db_name)
+        self.addCleanup(conn.close)
+        self.assertTrue(migrations.has_legacy_claims_table(conn))
+        self.assertEqual(conn.execute("SELECT last_claim_id FROM claims_migration").fetchone(),
+                         (300,))
+        self.assertEqual(conn.execute("SELECT count(*) FROM claims_compact").fetchone(), (300,))
+
+        self.assert_migrated(self.open_manager(), 1000)
+
+    def test_concurrent_openers_migrate_once(self):
+        self.create_legacy_database(120000)
+        managers = []
+        errors = []
+        barrier = threading.Barrier(2)
+
+        def open_manager():
+            barrier.wait()
+            try:
+                managers.append(DatabaseManager(self.db_name))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=open_manager) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for db_manager in managers:
+            self.addCleanup(db_manager.close)
+
+        self.assertEqual(errors, [])
+        for db_manager in managers:
+            self.assert_migrated(db_manager, 120000)
+
+
+class SchemaVersionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.db_name = os.path.join(self.tmp, "claims.db")
+
+    def create_database(self, version):
+        # Databasen som en äldre version av programmet lämnade den
+        conn = sqlite3.connect(self.db_name)
+        migrations.MIGRATIONS[0](conn)
+        conn.execute("INSERT INTO vehicle_classes (name) VALUES ('Car')")
+        conn.executemany("""
+        INSERT INTO claims (day, vehicle_class_id, amount_ore, description) VALUES (?, 1, ?, ?)
+        """, [(19723, 10000, "plåtskada"), (19724, 25050, "ruta")])
+        for step in migrations.MIGRATIONS[1:version]:
+            step(conn)
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.commit()
+        conn.close()
+
+    def test_older_schema_is_upgraded(self):
+        self.create_database(3)
+        db_manager = DatabaseManager(self.db_name)
+        self.addCleanup(db_manager.close)
+        conn = db_manager.get_connection()
+        self.assertEqual(migrations.get_schema_version(conn), migrations.SCHEMA_VERSION)
+        # Stegen efter version 3 gäller även raderna som redan fanns
+        self.assertEqual([row[0] for row in db_manager.search_claims("plåt")], [1])
+        self.assertEqual(db_manager.get_class_statistics()[0]["count"], 2)
+        # Raderna som fanns saknar hashvärde tills find_duplicates har gått igenom dem
+        self.assertEqual(db_manager.add_claim("2024-01-01", "Car", 100, "plåtskada"), 3)
+        self.assertEqual(db_manager.find_duplicates(), [(1, 3)])
+
+    def test_steps_can_run_again(self):
+        # Som om en process dog efter ett steg men innan user_version sparades
+        self.create_database(migrations.SCHEMA_VERSION)
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("PRAGMA user_version = 2")
+        conn.close()
+        db_manager = DatabaseManager(self.db_name)
+        self.addCleanup(db_manager.close)
+        self.assertEqual(migrations.get_schema_version(db_manager.get_connection()),
+                         migrations.SCHEMA_VERSION)
+        self.assertEqual(len(db_manager.get_all_claims()), 2)
+
+    def test_newer_schema_is_refused(self):
+        self.create_database(migrations.SCHEMA_VERSION)
+        conn = sqlite3.connect(self.db_name)
+        conn.execute(f"PRAGMA user_version = {migrations.SCHEMA_VERSION + 1}")
+        conn.close()
+        with self.assertRaises(migrations.SchemaVersionError):
+            DatabaseManager(self.db_name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Tester för frågecachen och att den töms när databasen ändras"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from query_cache import QueryCache
+
+
+class QueryCacheTest(unittest.TestCase):
+    def test_other_version_is_a_miss(self):
+        cache = QueryCache()
+        self.assertEqual(cache.get_or_load("a", 1, lambda: [1]), [1])
+        self.assertEqual(cache.get_or_load("a", 1, lambda: [2]), [1])
+        self.assertEqual(cache.get_or_load("a", 2, lambda: [3]), [3])
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = QueryCache(max_entries=2, max_rows=5)
+        cache.put("a", 1, [1])
+        cache.put("b", 1, [1])
+        cache.get_or_load("a", 1, list)
+        cache.put("c", 1, [1])
+        self.assertEqual(cache.get_or_load("b", 1, lambda: "laddad"), "laddad")
+        # Också antalet rader begränsar; för stora resultat sparas inte alls
+        cache.put("d", 1, [1] * 5)
+        self.assertEqual(cache.stats()["entries"], 1)
+        cache.put("e", 1, [1] * 6)
+        self.assertEqual(cache.get_or_load("e", 1, lambda: "laddad"), "laddad")
+
+
+class DatabaseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.db_name = os.path.join(self.tmp, "claims.db")
+        self.db_manager = self.open_manager()
+
+    def open_manager(self):
+        db_manager = DatabaseManager(self.db_name)
+        self.addCleanup(db_manager.close)
+        return db_manager
+
+    def test_own_writes_invalidate(self):
+        self.db_manager.add_claim("2024-01-01", "Car", 100, "")
+        self.assertEqual(len(self.db_manager.get_all_claims()), 1)
+        self.assertEqual(len(self.db_manager.get_all_claims()), 1)
+        self.assertEqual(self.db_manager.cache.hits, 1)
+
+        self.db_manager.add_claim("2024-01-02", "Car", 200, "")
+        self.assertEqual(len(self.db_manager.get_all_claims()), 2)
+        self.assertEqual(self.db_manager.get_class_statistics()[0]["count"], 2)
+
+    def test_writes_from_another_connection_invalidate(self):
+        other = self.open_manager()
+        self.db_manager.add_claim("2024-01-01", "Car", 100, "stenskott")
+        reads = [
+            lambda db_manager: db_manager.get_all_claims(),
+            lambda db_manager: db_manager.get_claims_page(10),
+            lambda db_manager: db_manager.query_claims(vehicle_class="Car"),
+            lambda db_manager: db_manager.search_claims("stenskott"),
+            lambda db_manager: db_manager.get_class_statistics()[0]["count"],
+        ]
+        before = [read(self.db_manager) for read in reads]
+
+        other.add_claim("2024-01-02", "Car", 200, "stenskott")
+        after = [read(self.db_manager) for read in reads]
+        self.assertEqual(after, [read(other) for read in reads])
+        self.assertNotEqual(after, before)
+        self.assertEqual([len(result) for result in after[:4]] + after[4:], [2, 2, 2, 2, 2])
+
+        other.clear_database()
+        self.assertEqual(self.db_manager.get_all_claims(), [])
+        self.assertEqual(self.db_manager.get_class_statistics(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
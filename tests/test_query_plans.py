@@ -0,0 +1,58 @@
+"""Kontrollerar med EXPLAIN QUERY PLAN att de vanliga filtren använder index
+
+En fråga får varken läsa hela claims-tabellen eller sortera i efterhand.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from database import DatabaseManager
+
+COMMON_FILTERS = [
+    {},
+    {"limit": 200},
+    {"vehicle_class": "Car"},
+    {"vehicle_class": "Car", "order": "date_asc"},
+    {"date_from": "2024-01-01", "date_to": "2024-03-31"},
+    {"vehicle_class": "Truck", "date_from": "2024-01-01", "date_to": "2024-03-31"},
+    {"vehicle_class": "Bus", "date_from": "2024-01-01", "min_amount": 5000, "limit": 50},
+]
+
+
+def plan_problems(plan):
+    """Returnerar de steg i planen som innebär fullständig läsning eller extra sortering"""
+    problems = []
+    for detail in plan:
+        if detail.split()[:2] in (["SCAN", "claims"], ["SCAN", "c"]) and "USING" not in detail:
+            problems.append(detail)
+        if "USE TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+class QueryPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.db_manager = DatabaseManager(os.path.join(self.tmp, "plans.db"))
+        self.addCleanup(self.db_manager.close)
+
+    def assert_plans_use_indexes(self, filters_list):
+        for filters in filters_list:
+            with self.subTest(**filters):
+                plan = self.db_manager.explain_query_claims(**filters)
+                self.assertEqual(plan_problems(plan), [], " | ".join(plan))
+
+    def test_common_filters_use_indexes(self):
+        self.assert_plans_use_indexes(COMMON_FILTERS)
+
+    def test_archives_use_indexes(self):
+        self.db_manager.add_claims_bulk([("2019-06-01", "Car", 100, ""),
+                                         ("2024-02-01", "Truck", 200, "")])
+        self.db_manager.archive_claims("2020-01-01")
+        self.assert_plans_use_indexes(COMMON_FILTERS + [{"date_from": "2019-01-01"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Tester för fritextsökningen och att sökindexet följer claims"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from database import DatabaseManager
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        # Utan frågecache, så att varje sökning läser sökindexet
+        self.db_manager = DatabaseManager(os.path.join(self.tmp, "claims.db"),
+                                          query_cache_entries=0)
+        self.addCleanup(self.db_manager.close)
+
+    def search_ids(self, text, **filters):
+        return sorted(row[0] for row in self.db_manager.search_claims(text, **filters))
+
+    def assert_index_in_sync(self):
+        # FTS5 jämför indexet med claims och kastar ett fel om de skiljer sig
+        with self.db_manager.transaction() as conn:
+            conn.execute("INSERT INTO claims_fts (claims_fts, rank) VALUES ('integrity-check', 1)")
+
+    def test_single_and_bulk_inserts_are_indexed(self):
+        self.db_manager.add_claim("2024-01-01", "Car", 100, "Plåtskada på bakluckan")
+        self.db_manager.add_claims_bulk([("2024-01-02", "Truck", 200, "Krossad vindruta"),
+                                         ("2024-01-03", "Car", 300, "plåt och ruta")])
+        self.assert_index_in_sync()
+        self.assertEqual(self.search_ids("plåt"), [1, 3])
+        # Orden matchas som prefix, och alla ord måste finnas
+        self.assertEqual(self.search_ids("vind"), [2])
+        self.assertEqual(self.search_ids("plå rut"), [3])
+        self.assertEqual(self.search_ids("plåt", vehicle_class="Car", date_from="2024-01-02"),
+                         [3])
+        self.assertEqual(self.search_ids("?!"), [])
+
+    def test_best_match_first(self):
+        self.db_manager.add_claims_bulk([("2024-01-01", "Car", 100, "ruta och en lång text om "
+                                          "något helt annat än själva skadan"),
+                                         ("2024-01-02", "Car", 200, "ruta ruta")])
+        self.assertEqual([row[0] for row in self.db_manager.search_claims("ruta")], [2, 1])
+
+    def test_updates_and_deletes_follow_claims(self):
+        self.db_manager.add_claims_bulk([("2024-01-01", "Car", 100, "stenskott"),
+                                         ("2024-01-02", "Car", 200, "repa")])
+        with self.db_manager.transaction() as conn:
+            conn.execute("UPDATE claims SET description = 'buckla' WHERE claim_id = 1")
+            conn.execute("DELETE FROM claims WHERE claim_id = 2")
+        self.assert_index_in_sync()
+        self.assertEqual(self.search_ids("stenskott"), [])
+        self.assertEqual(self.search_ids("buckla"), [1])
+        self.assertEqual(self.search_ids("repa"), [])
+
+    def test_removed_duplicates_leave_the_index(self):
+        self.db_manager.add_claims_bulk([("2024-01-01", "Car", 100, "stenskott")])
+        # En äldre rad utan hashvärde med samma innehåll
+        with self.db_manager.transaction() as conn:
+            conn.execute("""
+            INSERT INTO claims (day, vehicle_class_id, amount_ore, description)
+            SELECT day, vehicle_class_id, amount_ore, description FROM claims
+            """)
+        self.assertEqual(self.search_ids("stenskott"), [1, 2])
+        self.db_manager.find_duplicates(remove=True)
+        self.assert_index_in_sync()
+        self.assertEqual(self.search_ids("stenskott"), [1])
+
+    def test_clear_database_empties_the_index(self):
+        self.db_manager.add_claims_bulk([("2024-01-01", "Car", 100, "stenskott")])
+        self.db_manager.clear_database()
+        self.assert_index_in_sync()
+        self.assertEqual(self.search_ids("stenskott"), [])
+        self.db_manager.add_claim("2024-01-02", "Car", 100, "stenskott")
+        self.assertEqual(self.search_ids("stenskott"), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
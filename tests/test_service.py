@@ -0,0 +1,46 @@
+"""Tester för ClaimsService.dispatch utan HTTP-server"""
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from service import MAX_PAGE_SIZE, ClaimsService, HTTPError
+
+
+class ClaimsPageLimitTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_manager = DatabaseManager(os.path.join(self.tmp, "claims.db"))
+        self.db_manager.add_claims_bulk(
+            [("2024-01-02", "Car", amount, "") for amount in range(1, MAX_PAGE_SIZE + 11)])
+
+    def tearDown(self):
+        self.db_manager.close()
+        shutil.rmtree(self.tmp)
+
+    def get_claims(self, limit):
+        async def request():
+            service = ClaimsService(self.db_manager)
+            try:
+                return await service.dispatch("GET", f"/claims?limit={limit}", b"")
+            finally:
+                await service.stop()
+        return asyncio.run(request())
+
+    def test_limit_outside_page_range_is_rejected(self):
+        for limit in (-1, 0, MAX_PAGE_SIZE + 1):
+            with self.assertRaises(HTTPError) as caught:
+                self.get_claims(limit)
+            self.assertEqual(caught.exception.status, 400)
+
+    def test_full_page_has_next_key(self):
+        status, body = self.get_claims(MAX_PAGE_SIZE)
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body["claims"]), MAX_PAGE_SIZE)
+        self.assertIsNotNone(body["next"])
+
+
+if __name__ == "__main__":
+    unittest.main()
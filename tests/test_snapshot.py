@@ -0,0 +1,76 @@
+"""Tester för ClaimSnapshot.update mot en databas som ändras"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from database import DatabaseManager
+from snapshot import ClaimSnapshot, np
+
+
+@unittest.skipIf(np is None, "kräver numpy")
+class SnapshotUpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.db_manager = DatabaseManager(os.path.join(self.tmp, "claims.db"))
+        self.path = os.path.join(self.tmp, "snapshot")
+
+    def tearDown(self):
+        self.db_manager.close()
+        shutil.rmtree(self.tmp)
+
+    def classes(self, snapshot):
+        return {row["vehicle_class"]: row["count"] for row in snapshot.class_statistics()}
+
+    def test_rebuilds_after_clear_with_same_row_count(self):
+        self.db_manager.add_claims_bulk([("2024-01-01", "Car", 100 + i, "") for i in range(3)])
+        self.assertEqual(self.classes(ClaimSnapshot.update(self.db_manager, self.path)),
+                         {"Car": 3})
+
+        # Samma claim_id 1..3 som förut, men andra anmälningar
+        self.db_manager.clear_database()
+        self.db_manager.add_claims_bulk([("2024-01-01", "Truck", 100 + i, "") for i in range(3)])
+        self.assertEqual(self.classes(ClaimSnapshot.update(self.db_manager, self.path)),
+                         {"Truck": 3})
+
+    def test_rebuilds_after_duplicates_are_removed(self):
+        self.db_manager.add_claims_bulk([("2024-01-01", "Car", 100, "a"),
+                                         ("2024-01-02", "Car", 200, "b")])
+        # Äldre rader utan hashvärde, så att dubbletten kommer in i tabellen
+        with self.db_manager.transaction() as conn:
+            conn.execute("UPDATE claims SET content_hash = NULL")
+            conn.execute("""
+            INSERT INTO claims (day, vehicle_class_id, amount_ore, description)
+            SELECT day, vehicle_class_id, amount_ore, description FROM claims WHERE claim_id = 1
+            """)
+        self.assertEqual(ClaimSnapshot.update(self.db_manager, self.path).rows, 3)
+        self.db_manager.find_duplicates(remove=True)
+        self.db_manager.add_claim("2024-01-03", "Car", 300, "c")
+        snapshot = ClaimSnapshot.update(self.db_manager, self.path)
+        self.assertEqual(snapshot.claim_id.tolist(), [1, 2, 4])
+        self.assertEqual(snapshot.amount_ore.tolist(), [10000, 20000, 30000])
+
+    def test_archiving_keeps_snapshot(self):
+        self.db_manager.add_claims_bulk([("2019-05-01", "Car", 100, ""),
+                                         ("2024-01-01", "Car", 200, "")])
+        ClaimSnapshot.update(self.db_manager, self.path)
+        self.db_manager.archive_claims("2020-01-01")
+        self.db_manager.add_claim("2024-02-01", "Truck", 300, "")
+
+        # Bara den nya raden ska läsas, inte hela tabellen igen
+        read = []
+        iter_raw_claims = self.db_manager.iter_raw_claims
+
+        def recording(*args):
+            for rows in iter_raw_claims(*args):
+                read.extend(rows)
+                yield rows
+
+        self.db_manager.iter_raw_claims = recording
+        snapshot = ClaimSnapshot.update(self.db_manager, self.path)
+        self.assertEqual([row[0] for row in read], [3])
+        self.assertEqual(snapshot.claim_id.tolist(), [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Tester för ClaimValidator: radvis och i batch ska ge samma felkoder"""
+import unittest
+
+from validators import (ClaimValidator, ERROR_AMOUNT_FORMAT, ERROR_AMOUNT_TOO_LARGE,
+                        ERROR_DATE_FORMAT, ERROR_MESSAGES, ERROR_REQUIRED_FIELDS, VALID,
+                        _validate_batch_python, np)
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+AMOUNTS = {
+    "100": VALID,
+    "9e16": VALID,
+    "inf": ERROR_AMOUNT_FORMAT,
+    "-inf": ERROR_AMOUNT_FORMAT,
+    "nan": ERROR_AMOUNT_FORMAT,
+    "1e400": ERROR_AMOUNT_FORMAT,
+    "1e17": ERROR_AMOUNT_TOO_LARGE,
+}
+
+
+class AmountRangeTest(unittest.TestCase):
+    def test_scalar(self):
+        for amount, code in AMOUNTS.items():
+            is_valid, result = ClaimValidator.validate_claim_data("2024-01-01", "Car", amount)
+            self.assertEqual(is_valid, code == VALID, amount)
+            if code != VALID:
+                self.assertEqual(result, ERROR_MESSAGES[code])
+
+    def test_batch(self):
+        amounts = list(AMOUNTS)
+        size = len(amounts)
+        _, codes, _ = _validate_batch_python(["2024-01-01"] * size, ["Car"] * size, amounts)
+        self.assertEqual(codes, list(AMOUNTS.values()))
+
+    @unittest.skipIf(np is None, "kräver numpy")
+    def test_numeric_column(self):
+        amounts = np.array([100.0, np.inf, np.nan, 1e17])
+        _, codes, _ = ClaimValidator.validate_claims_batch(
+            np.array(["2024-01-01"] * 4), np.array(["Car"] * 4), amounts)
+        self.assertEqual(codes.tolist(),
+                         [VALID, ERROR_AMOUNT_FORMAT, ERROR_AMOUNT_FORMAT, ERROR_AMOUNT_TOO_LARGE])
+
+
+class MissingValueTest(unittest.TestCase):
+    def assert_same_as_scalar(self, dates, vehicle_classes, amounts, expected):
+        _, codes, _ = ClaimValidator.validate_claims_batch(dates, vehicle_classes, amounts)
+        codes = codes.tolist() if hasattr(codes, "tolist") else codes
+        self.assertEqual(codes, expected)
+        for row, code in zip(zip(_list(dates), _list(vehicle_classes), _list(amounts)), codes):
+            is_valid, result = ClaimValidator.validate_claim_data(*row)
+            self.assertEqual(is_valid, code == VALID, row)
+            if code != VALID:
+                self.assertEqual(result, ERROR_MESSAGES[code], row)
+
+    def test_list(self):
+        nan = float("nan")
+        self.assert_same_as_scalar(
+            ["2024-01-01", None, nan, 20240101, "2024-01-01"], ["Car", "Car", "Car", "Car", nan],
+            [100] * 5,
+            [VALID, ERROR_REQUIRED_FIELDS, ERROR_REQUIRED_FIELDS, ERROR_DATE_FORMAT,
+             ERROR_REQUIRED_FIELDS])
+
+    @unittest.skipIf(pd is None, "kräver pandas")
+    def test_dataframe_with_missing_values(self):
+        frame = pd.DataFrame({
+            "date": ["2024-01-01", None, "2024-01-02", "01/03/2024"],
+            "vehicle_class": ["Car", "Truck", None, "Bus"],
+            "claim_amount": [100.0, 200.0, 300.0, 400.0],
+        })
+        self.assert_same_as_scalar(
+            frame["date"], frame["vehicle_class"], frame["claim_amount"],
+            [VALID, ERROR_REQUIRED_FIELDS, ERROR_REQUIRED_FIELDS, ERROR_DATE_FORMAT])
+
+    @unittest.skipIf(pd is None, "kräver pandas")
+    def test_datetime_column(self):
+        dates = pd.Series(pd.to_datetime(["2024-01-01", None]))
+        self.assert_same_as_scalar(dates, pd.Series(["Car", "Car"]), pd.Series([100.0, 200.0]),
+                                   [ERROR_DATE_FORMAT, ERROR_REQUIRED_FIELDS])
+
+
+def _list(column):
+    # Samma värden som batchvalideringen ser för varje rad
+    return np.asarray(column).tolist() if hasattr(column, "dtype") else list(column)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Tester för DatabaseWorker utan Tk; resultaten levereras med poll()"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from database import DatabaseManager
+from worker import DatabaseWorker
+
+
+def wait_until_idle(worker, timeout=10):
+    deadline = time.monotonic() + timeout
+    while worker.pending():
+        if time.monotonic() > deadline:
+            raise AssertionError("jobben blev aldrig klara")
+        time.sleep(0.005)
+
+
+class DatabaseWorkerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        # Utan frågecache, så att get_all_claims alltid kör SQL
+        cls.db_manager = DatabaseManager(os.path.join(cls.tmp, "claims.db"),
+                                         query_cache_entries=0)
+        cls.db_manager.add_claims_bulk(
+            (f"2024-01-{day % 28 + 1:02d}", "Car", 100 + day, f"skada {day}")
+            for day in range(50000))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db_manager.close()
+        shutil.rmtree(cls.tmp)
+
+    def setUp(self):
+        self.worker = DatabaseWorker(self.db_manager)
+        self.addCleanup(self.worker.stop)
+
+    def test_result_is_delivered_by_poll(self):
+        results = []
+        self.worker.submit(self.db_manager.get_claims_page, 10, on_done=results.append)
+        wait_until_idle(self.worker)
+        # Inget levereras förrän poll() anropas
+        self.assertEqual(results, [])
+        self.worker.poll()
+        self.assertEqual(len(results), 1)
+        self.assertEqual(len(results[0]), 10)
+
+    def test_exception_is_delivered_to_on_error(self):
+        done = []
+        errors = []
+
+        def fail():
+            raise ValueError("trasig")
+
+        self.worker.submit(fail, on_done=done.append, on_error=errors.append)
+        wait_until_idle(self.worker)
+        self.worker.poll()
+        self.assertEqual(done, [])
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], ValueError)
+
+    def test_cancelled_queued_task_is_skipped(self):
+        release = threading.Event()
+        calls = []
+        # Första jobbet håller tråden så att det andra ligger kvar i kön
+        self.worker.submit(release.wait, 5)
+        task = self.worker.submit(calls.append, "körd", on_done=calls.append)
+        task.cancel()
+        release.set()
+        wait_until_idle(self.worker)
+        self.worker.poll()
+        self.assertEqual(calls, [])
+
+    def test_running_query_is_interrupted(self):
+        started = threading.Event()
+        raised = []
+        delivered = []
+
+        def load():
+            started.set()
+            try:
+                return self.db_manager.get_all_claims()
+            except sqlite3.OperationalError as e:
+                raised.append(e)
+                raise
+
+        task = self.worker.submit(load, on_done=delivered.append, on_error=delivered.append)
+        self.assertTrue(started.wait(5))
+        # interrupt() gör ingenting innan frågan har börjat köras; den tar
+        # flera gånger längre än så här
+        time.sleep(0.05)
+        task.cancel()
+        wait_until_idle(self.worker)
+        self.worker.poll()
+
+        self.assertEqual(len(raised), 1)
+        self.assertIn("interrupt", str(raised[0]))
+        # Ett avbrutet jobb rapporterar varken resultat eller fel
+        self.assertEqual(delivered, [])
+
+        # Tråden fortsätter med nästa jobb
+        results = []
+        self.worker.submit(self.db_manager.get_claims_page, 1, on_done=results.append)
+        wait_until_idle(self.worker)
+        self.worker.poll()
+        self.assertEqual(len(results), 1)
+
+    def test_pending_counts_queued_and_running_tasks(self):
+        release = threading.Event()
+        self.assertEqual(self.worker.pending(), 0)
+        self.worker.submit(release.wait, 5)
+        self.worker.submit(int)
+        cancelled = self.worker.submit(int)
+        self.assertEqual(self.worker.pending(), 3)
+        cancelled.cancel()
+        release.set()
+        wait_until_idle(self.worker)
+        self.assertEqual(self.worker.pending(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
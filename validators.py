@@ -1,5 +1,38 @@
+import math
+import time
 from datetime import datetime
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from metrics import METRICS
+
+# Felkoder för batchvalideringen, i samma ordning som kontrollerna görs
+VALID = 0
+ERROR_REQUIRED_FIELDS = 1
+ERROR_DATE_FORMAT = 2
+ERROR_AMOUNT_FORMAT = 3
+ERROR_AMOUNT_NOT_POSITIVE = 4
+ERROR_AMOUNT_TOO_LARGE = 5
+
+ERROR_MESSAGES = {
+    VALID: "",
+    ERROR_REQUIRED_FIELDS: "Vänligen fyll i alla obligatoriska fält!",
+    ERROR_DATE_FORMAT: "Ogiltigt datumformat! Använd YYYY-MM-DD",
+    ERROR_AMOUNT_FORMAT: "Ogiltigt belopp! Ange ett numeriskt värde.",
+    ERROR_AMOUNT_NOT_POSITIVE: "Belopp måste vara större än 0",
+    ERROR_AMOUNT_TOO_LARGE: "Beloppet är för stort!",
+}
+
+# Beloppen lagras som heltal öre i en 64-bitars kolumn
+MAX_AMOUNT_ORE = 2.0**63
+
+_VALIDATION_TIME = METRICS.histogram("claims_operation_seconds", operation="validation")
+_BATCH_VALIDATION_TIME = METRICS.histogram("claims_operation_seconds",
+                                           operation="validation_batch")
+
 class ClaimValidator:
     @staticmethod
     def validate_date(date_string):
@@ -7,43 +40,218 @@ class ClaimValidator:
         try:
             datetime.strptime(date_string, "%Y-%m-%d")
             return True, ""
-        except ValueError:
-            return False, "Ogiltigt datumformat! Använd YYYY-MM-DD"
-    
+        except (TypeError, ValueError):
+            # TypeError: inte en sträng, t.ex. ett datetime64-värde
+            return False, ERROR_MESSAGES[ERROR_DATE_FORMAT]
+
     @staticmethod
     def validate_amount(amount_string):
         """Validerar att belopp är korrekt"""
         try:
             amount = float(amount_string)
-            if amount <= 0:
-                return False, "Belopp måste vara större än 0"
-            return True, amount
-        except ValueError:
-            return False, "Ogiltigt belopp! Ange ett numeriskt värde."
-    
+        except (ValueError, OverflowError):
+            return False, ERROR_MESSAGES[ERROR_AMOUNT_FORMAT]
+        # "nan" och "inf" går att tolka men är inga belopp
+        if not math.isfinite(amount):
+            return False, ERROR_MESSAGES[ERROR_AMOUNT_FORMAT]
+        if amount <= 0:
+            return False, ERROR_MESSAGES[ERROR_AMOUNT_NOT_POSITIVE]
+        if amount * 100 >= MAX_AMOUNT_ORE:
+            return False, ERROR_MESSAGES[ERROR_AMOUNT_TOO_LARGE]
+        return True, amount
+
     @staticmethod
     def validate_required_fields(date, vehicle_class, amount):
         """Validerar att obligatoriska fält är ifyllda"""
-        if not all([date, vehicle_class, amount]):
-            return False, "Vänligen fyll i alla obligatoriska fält!"
+        if not (_is_present(date) and _is_present(vehicle_class) and amount):
+            return False, ERROR_MESSAGES[ERROR_REQUIRED_FIELDS]
         return True, ""
-    
+
     @staticmethod
     def validate_claim_data(date, vehicle_class, amount):
         """Validerar all claim-data"""
-        # Validera obligatoriska fält
-        is_valid, message = ClaimValidator.validate_required_fields(date, vehicle_class, amount)
-        if not is_valid:
-            return False, message
-        
-        # Validera datum
-        is_valid, message = ClaimValidator.validate_date(date)
-        if not is_valid:
-            return False, message
-        
-        # Validera belopp
-        is_valid, message = ClaimValidator.validate_amount(amount)
-        if not is_valid:
-            return False, message
-        
-        return True, message  # message innehåller nu det konverterade beloppet
\ No newline at end of file
+        start = time.perf_counter()
+        try:
+            # Validera obligatoriska fält
+            is_valid, message = ClaimValidator.validate_required_fields(date, vehicle_class, amount)
+            if not is_valid:
+                return False, message
+
+            # Validera datum
+            is_valid, message = ClaimValidator.validate_date(date)
+            if not is_valid:
+                return False, message
+
+            # Validera belopp
+            is_valid, message = ClaimValidator.validate_amount(amount)
+            if not is_valid:
+                return False, message
+
+            return True, message  # message innehåller nu det konverterade beloppet
+        finally:
+            _VALIDATION_TIME.observe(time.perf_counter() - start)
+
+    @staticmethod
+    def validate_claims_batch(dates, vehicle_classes, amounts):
+        """Validerar kolumner av claim-data i ett svep
+
+        Tar listor eller NumPy/Pandas-kolumner och returnerar (valid, codes, converted):
+        en giltighetsmask, en felkod per rad (se ERROR_MESSAGES) och de konverterade
+        beloppen (nan för ogiltiga rader). Resultatet är detsamma som för
+        validate_claim_data rad för rad. Kolumner som är NumPy/Pandas-arrayer ger
+        arrayer tillbaka (numeriska beloppskolumner kontrolleras helt vektoriserat),
+        vanliga listor ger listor.
+        """
+        start = time.perf_counter()
+        try:
+            columns = (dates, vehicle_classes, amounts)
+            if np is not None and any(hasattr(column, "dtype") for column in columns):
+                return _validate_batch_numpy(dates, vehicle_classes, amounts)
+            return _validate_batch_python(dates, vehicle_classes, amounts)
+        finally:
+            _BATCH_VALIDATION_TIME.observe(time.perf_counter() - start)
+
+
+def _is_present(value):
+    """Falskt för tomma fält; pandas markerar saknade värden med NaN, NaT eller NA"""
+    try:
+        return bool(value and value == value)
+    except TypeError:
+        # pandas.NA går inte att tolka som sant eller falskt
+        return False
+
+
+def _is_valid_date(date_string):
+    try:
+        datetime.strptime(date_string, "%Y-%m-%d")
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _date_flags(dates):
+    """Datumkontroll med cache: varje unikt datum tolkas bara en gång"""
+    cache = {date: _is_valid_date(date) for date in set(dates) if _is_present(date)}
+    return [cache.get(date, False) for date in dates]
+
+
+def _convert_amounts(amounts):
+    """Konverterar belopp med float(); None där konverteringen misslyckas
+
+    Även nan och oändligheter blir None, så att de avvisas som ogiltiga belopp.
+    """
+    try:
+        # Snabb väg: hela kolumnen är numerisk
+        converted = list(map(float, amounts))
+    except (TypeError, ValueError, OverflowError):
+        converted = []
+        for amount in amounts:
+            try:
+                converted.append(float(amount))
+            except (TypeError, ValueError, OverflowError):
+                converted.append(None)
+
+    isfinite = math.isfinite
+    if not all(value is None or isfinite(value) for value in converted):
+        converted = [value if value is None or isfinite(value) else None
+                     for value in converted]
+    return converted
+
+
+def _as_list(column):
+    return column.tolist() if hasattr(column, "tolist") else list(column)
+
+
+def _validate_batch_python(dates, vehicle_classes, amounts):
+    dates = _as_list(dates)
+    vehicle_classes = _as_list(vehicle_classes)
+    amounts = _as_list(amounts)
+
+    date_ok = _date_flags(dates)
+    converted = _convert_amounts(amounts)
+
+    nan = float("nan")
+    valid, codes, values = [], [], []
+    for date, vehicle_class, amount, is_date_ok, value in zip(
+            dates, vehicle_classes, amounts, date_ok, converted):
+        if not (_is_present(date) and _is_present(vehicle_class) and amount):
+            code = ERROR_REQUIRED_FIELDS
+        elif not is_date_ok:
+            code = ERROR_DATE_FORMAT
+        elif value is None:
+            code = ERROR_AMOUNT_FORMAT
+        elif value <= 0:
+            code = ERROR_AMOUNT_NOT_POSITIVE
+        elif value * 100 >= MAX_AMOUNT_ORE:
+            code = ERROR_AMOUNT_TOO_LARGE
+        else:
+            code = VALID
+        valid.append(code == VALID)
+        codes.append(code)
+        values.append(value if code == VALID else nan)
+
+    return valid, codes, values
+
+
+def _as_array(column):
+    """Gör om en kolumn till en array utan att ändra värdenas typ"""
+    if hasattr(column, "dtype"):
+        return np.asarray(column)
+    column = list(column)
+    array = np.asarray(column)
+    # np.asarray gör om blandade listor till strängar, t.ex. 0.0 -> "0.0"
+    if array.dtype.kind == "U" and not all(isinstance(value, str) for value in column):
+        return np.array(column, dtype=object)
+    return array
+
+
+def _present_mask(column, values=None):
+    """_is_present för varje värde i en array; values är column.tolist() om den redan finns"""
+    if column.dtype.kind == "U":
+        return column != ""
+    if values is None:
+        values = column.tolist()
+    return np.fromiter(map(_is_present, values), dtype=bool, count=len(values))
+
+
+def _validate_batch_numpy(dates, vehicle_classes, amounts):
+    dates = _as_array(dates)
+    vehicle_classes = _as_array(vehicle_classes)
+    amounts = _as_array(amounts)
+    size = len(dates)
+
+    # Datum: varje unikt värde tolkas bara en gång (snabbare än np.unique på strängar)
+    date_list = dates.tolist()
+    date_present = _present_mask(dates, date_list)
+    date_ok = np.array(_date_flags(date_list), dtype=bool)
+
+    class_present = _present_mask(vehicle_classes)
+
+    # Belopp: numeriska kolumner konverteras helt vektoriserat
+    if amounts.dtype.kind in "biuf":
+        values = amounts.astype(np.float64)
+        amount_present = amounts != 0
+        amount_ok = np.isfinite(values)
+    else:
+        amount_list = amounts.tolist()
+        amount_present = np.fromiter(map(bool, amount_list), dtype=bool, count=size)
+        converted = _convert_amounts(amount_list)
+        amount_ok = np.fromiter((value is not None for value in converted), dtype=bool, count=size)
+        values = np.array([np.nan if value is None else value for value in converted],
+                          dtype=np.float64)
+
+    # np.select väljer första uppfyllda villkor, samma ordning som validate_claim_data
+    with np.errstate(invalid="ignore", over="ignore"):
+        not_positive = values <= 0
+        too_large = values * 100 >= MAX_AMOUNT_ORE
+    codes = np.select(
+        [~(date_present & class_present & amount_present), ~date_ok, ~amount_ok, not_positive,
+         too_large],
+        [ERROR_REQUIRED_FIELDS, ERROR_DATE_FORMAT, ERROR_AMOUNT_FORMAT, ERROR_AMOUNT_NOT_POSITIVE,
+         ERROR_AMOUNT_TOO_LARGE],
+        default=VALID,
+    ).astype(np.int8)
+    valid = codes == VALID
+    values = np.where(valid, values, np.nan)
+
+    return valid, codes, values
@@ -0,0 +1,118 @@
+import queue
+import threading
+
+
+class Task:
+    """Ett jobb i en DatabaseWorker-kö"""
+
+    def __init__(self, worker, func, args, kwargs, on_done, on_error):
+        self.worker = worker
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        """Avbryter jobbet; ett pågående SQL-anrop avbryts med interrupt()"""
+        self.worker.cancel(self)
+
+
+class DatabaseWorker:
+    """Kör databasanrop i en egen tråd så att GUI-tråden aldrig blockeras
+
+    Jobben körs i tur och ordning. Resultaten läggs i en kö som GUI-tråden
+    tömmer med poll(); attach() schemalägger det med root.after. Utan Tk kan
+    poll() anropas direkt, t.ex. i tester eller skript.
+    """
+
+    def __init__(self, db_manager, name="db-worker"):
+        self.db_manager = db_manager
+        self._tasks = queue.Queue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._current = None
+        self._conn = None
+        self._pending = 0
+        self._root = None
+        self._after_id = None
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, on_done=None, on_error=None, **kwargs):
+        """Lägger ett anrop func(*args, **kwargs) i kön och returnerar dess Task"""
+        task = Task(self, func, args, kwargs, on_done, on_error)
+        with self._lock:
+            self._pending += 1
+        self._tasks.put(task)
+        return task
+
+    def cancel(self, task):
+        with self._lock:
+            task.cancelled = True
+            if self._current is task and self._conn is not None:
+                self._conn.interrupt()
+
+    def pending(self):
+        """Antal jobb som väntar eller körs"""
+        with self._lock:
+            return self._pending
+
+    def poll(self):
+        """Levererar färdiga resultat till sina callbacks i den anropande tråden"""
+        while True:
+            try:
+                task, callback, value = self._results.get_nowait()
+            except queue.Empty:
+                return
+            # Jobbet kan ha avbrutits efter att det blev klart
+            if not task.cancelled:
+                callback(value)
+
+    def attach(self, root, interval=50):
+        """Tömmer resultatkön regelbundet från Tk:s huvudloop"""
+        def tick():
+            self.poll()
+            self._after_id = root.after(interval, tick)
+        self._root = root
+        self._after_id = root.after(interval, tick)
+
+    def stop(self, timeout=5):
+        """Avslutar tråden när redan köade jobb har körts"""
+        if self._after_id is not None:
+            self._root.after_cancel(self._after_id)
+            self._after_id = None
+        self._tasks.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        # Trådens egen anslutning, behövs för att kunna avbryta pågående SQL
+        self._conn = self.db_manager.get_connection()
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+
+            with self._lock:
+                if task.cancelled:
+                    self._pending -= 1
+                    continue
+                self._current = task
+
+            try:
+                result = task.func(*task.args, **task.kwargs)
+                callback = task.on_done
+            except Exception as e:
+                result = e
+                callback = task.on_error
+            finally:
+                with self._lock:
+                    self._current = None
+                    self._pending -= 1
+                    cancelled = task.cancelled
+
+            # Avbrutna jobb rapporterar ingenting, inte heller "interrupted"-felet
+            if callback is not None and not cancelled:
+                self._results.put((task, callback, result))